@@ -4,3 +4,5 @@ UI组件模块
 from .video_list_widget import VideoListWidget
 from .video_player import VideoPlayer
 from .annotation_widget import AnnotationWidget
+from .marker_slider import MarkerSlider
+from .filmstrip_widget import FilmstripWidget
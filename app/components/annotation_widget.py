@@ -5,24 +5,45 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QTextEdit
 )
-from PyQt6.QtCore import pyqtSignal, Qt, QPoint, QRect, QRectF
+from PyQt6.QtCore import pyqtSignal, Qt, QPoint, QRect, QSize
 from PyQt6.QtGui import (
     QImage, QPixmap, QPainter, QPen, QColor, 
     QMouseEvent, QWheelEvent, QBrush
 )
 
 import cv2
+import math
 import numpy as np
+from collections import OrderedDict
+
+from app.utils.frame_buffer import FrameBuffer
+from app.utils.image_pyramid import ImagePyramid
+from app.utils.reference_renderer import draw_points
 
 
 class ImageCanvas(QWidget):
-    """可交互的图像画布（修复版）"""
+    """可交互的图像画布（修复版）
+
+    图像按当前widget尺寸缩放一次后缓存为QPixmap，只在图像或尺寸变化时重建；
+    ROI框和标记点作为覆盖层绘制在缓存图像之上，交互时只重绘变化的区域。
+    滚轮放大后改为按图块绘制：从按需构建的图像金字塔中选取合适的层级，
+    只转换和绘制可见的图块，转换结果保存在图块缓存中。
+    """
+    
+    POINT_RADIUS = 10   # 标记点半径(像素)
+    OVERLAY_MARGIN = 3  # 覆盖层重绘区域的线宽余量
+    
+    ZOOM_STEP = 1.25        # 滚轮每格的缩放倍数
+    MAX_SCALE = 16.0        # 最大显示比例（原图1像素显示为16像素）
+    TILE_SIZE = 256         # 图块边长(层级像素)
+    TILE_CACHE_SIZE = 256   # 图块缓存最多保留的图块数
     
     def __init__(self, parent=None):
         super().__init__(parent)
         
-        self.original_image = None  # OpenCV格式的原始图像 (BGR)
-        self.display_image = None   # 用于显示的QImage
+        self.frame_buffer = None    # 与播放器共享的只读帧缓冲
+        self.original_image = None  # OpenCV格式的原始图像 (BGR，只读视图)
+        self.display_image = None   # 缩放到显示尺寸的QPixmap（渲染缓存）
         
         # ROI相关
         self.roi_start = None       # 原图坐标
@@ -36,9 +57,19 @@ class ImageCanvas(QWidget):
         self.points = []
         
         # 显示相关
-        self.scale = 1.0            # 图像缩放比例（自动计算）
+        self.scale = 1.0            # 图像缩放比例（适应窗口比例 × 放大倍数）
+        self.fit_scale = 1.0        # 适应窗口的缩放比例（自动计算）
+        self.zoom = 1.0             # 滚轮放大倍数，1.0 = 适应窗口
         self.image_offset = QPoint(0, 0)  # 图像在widget中的偏移
         
+        # 缩放显示: 图像金字塔和图块缓存 {(层级, 列, 行): QPixmap}
+        self.pyramid = None
+        self.tile_cache = OrderedDict()
+        
+        # 中键拖动平移
+        self.pan_start = None
+        self.pan_start_offset = None
+        
         # 模式: "roi" = 绘制ROI, "point" = 标记点
         self.mode = "roi"
         
@@ -48,8 +79,17 @@ class ImageCanvas(QWidget):
         self.setStyleSheet("background-color: #2d2d2d;")
         
     def set_image(self, cv_image):
-        """设置要显示的图像（OpenCV BGR格式）"""
-        self.original_image = cv_image.copy()
+        """设置要显示的图像（OpenCV BGR格式或FrameBuffer）
+
+        图像只读共享，不复制；裁剪ROI时才生成副本。
+        """
+        self.frame_buffer = FrameBuffer.wrap(cv_image)
+        self.original_image = self.frame_buffer.array
+        self.display_image = None
+        self.pyramid = ImagePyramid(self.frame_buffer)
+        self.tile_cache.clear()
+        self.zoom = 1.0
+        self.update_layout()
         self.roi_rect = None
         self.roi_start = None
         self.roi_end = None
@@ -58,49 +98,117 @@ class ImageCanvas(QWidget):
         self.mode = "roi"
         self.update()
         
-    def paintEvent(self, event):
-        """绑定绑定绑定绘制事件"""
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    def replace_image(self, cv_image):
+        """换成同尺寸的另一帧，保留ROI、标记点和缩放位置；尺寸不同时等同于 set_image"""
+        frame_buffer = FrameBuffer.wrap(cv_image)
+        if self.frame_buffer is None or frame_buffer.shape != self.frame_buffer.shape:
+            self.set_image(frame_buffer)
+            return
+            
+        self.frame_buffer = frame_buffer
+        self.original_image = frame_buffer.array
+        self.display_image = None
+        self.pyramid = ImagePyramid(frame_buffer)
+        self.tile_cache.clear()
+        self.update()
         
-        # 填充背景
-        painter.fillRect(self.rect(), QColor("#2d2d2d"))
+    def resizeEvent(self, event):
+        """尺寸变化时重新计算布局，渲染缓存在下次绘制时重建"""
+        super().resizeEvent(event)
+        self.update_layout()
         
+    def update_layout(self):
+        """计算缩放比例和偏移（适应窗口时居中显示）"""
         if self.original_image is None:
-            painter.setPen(QColor("#888"))
-            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "等待接收帧...")
             return
             
-        # 转换OpenCV图像为QImage
-        rgb_image = cv2.cvtColor(self.original_image, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        q_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        
-        # 计算缩放比例以适应widget
+        h, w = self.original_image.shape[:2]
         widget_w = self.width()
         widget_h = self.height()
         
         scale_w = widget_w / w
         scale_h = widget_h / h
-        self.scale = min(scale_w, scale_h, 1.0)  # 不放大，只缩小
-        
-        # 计算显示尺寸和偏移（居中显示）
-        display_w = int(w * self.scale)
-        display_h = int(h * self.scale)
+        self.fit_scale = min(scale_w, scale_h, 1.0)  # 适应窗口时不放大，只缩小
+        self.scale = self.fit_scale * self.zoom
+        self.set_offset(self.image_offset)
+        
+    def set_offset(self, offset):
+        """设置图像偏移：图像小于窗口的方向居中，否则限制在不露出空白的范围内"""
+        h, w = self.original_image.shape[:2]
+        display_w = math.floor(w * self.scale)
+        display_h = math.floor(h * self.scale)
+        
+        def clamp(value, display, widget):
+            if display <= widget:
+                return (widget - display) // 2
+            return max(widget - display, min(value, 0))
+            
         self.image_offset = QPoint(
-            (widget_w - display_w) // 2,
-            (widget_h - display_h) // 2
+            clamp(offset.x(), display_w, self.width()),
+            clamp(offset.y(), display_h, self.height())
         )
         
-        # 绘制图像
-        target_rect = QRectF(
-            self.image_offset.x(), 
-            self.image_offset.y(),
-            display_w, 
-            display_h
-        )
-        painter.drawImage(target_rect, q_image)
+    def set_zoom(self, zoom, anchor):
+        """以widget坐标 anchor 为中心缩放（锚点下的图像位置保持不动）"""
+        max_zoom = max(1.0, self.MAX_SCALE / self.fit_scale)
+        zoom = max(1.0, min(zoom, max_zoom))
+        if zoom == self.zoom:
+            return
+            
+        image_x = (anchor.x() - self.image_offset.x()) / self.scale
+        image_y = (anchor.y() - self.image_offset.y()) / self.scale
+        
+        self.zoom = zoom
+        self.scale = self.fit_scale * zoom
+        self.set_offset(QPoint(
+            round(anchor.x() - image_x * self.scale),
+            round(anchor.y() - image_y * self.scale)
+        ))
+        self.update()
+        
+    def get_display_image(self):
+        """获取缩放到显示尺寸的图像，仅在图像或显示尺寸变化时重建"""
+        h, w = self.original_image.shape[:2]
+        display_size = QSize(max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        
+        if self.display_image is None or self.display_image.size() != display_size:
+            # 从分辨率不低于显示尺寸的最粗金字塔层级缩放，避免每次从原图缩小
+            image = self.pyramid.level(self.pyramid.level_for_scale(self.scale))
+            if (display_size.width(), display_size.height()) != image.shape[1::-1]:
+                image = FrameBuffer(cv2.resize(
+                    image.array, (display_size.width(), display_size.height()),
+                    interpolation=cv2.INTER_AREA
+                ))
+            self.display_image = QPixmap.fromImage(image.to_qimage())
+            
+        return self.display_image
+        
+    def paintEvent(self, event):
+        """绑定绑定绑定绘制事件"""
+        painter = QPainter(self)
+        dirty_rect = event.rect()
+        
+        # 填充背景
+        painter.fillRect(dirty_rect, QColor("#2d2d2d"))
+        
+        if self.original_image is None:
+            painter.setPen(QColor("#888"))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "等待接收帧...")
+            return
+            
+        if self.zoom == 1.0:
+            # 绘制图像：只贴出缓存图像中需要重绘的部分
+            pixmap = self.get_display_image()
+            target_rect = dirty_rect.intersected(QRect(self.image_offset, pixmap.size()))
+            if not target_rect.isEmpty():
+                painter.drawPixmap(
+                    target_rect, pixmap, target_rect.translated(-self.image_offset)
+                )
+        else:
+            self.draw_tiles(painter, dirty_rect)
+            
+        # 绘制覆盖层
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
         # 绘制ROI框
         if self.roi_rect:
@@ -120,6 +228,8 @@ class ImageCanvas(QWidget):
             
         # 绘制标记点
         for point, point_type in self.points:
+            if not dirty_rect.intersects(self.point_rect(point)):
+                continue
             display_point = self.image_to_widget_point(point)
             
             if point_type == "remove":
@@ -134,56 +244,141 @@ class ImageCanvas(QWidget):
             # 绘制圆点
             painter.setPen(QPen(Qt.GlobalColor.black, 2))
             painter.setBrush(QBrush(color))
-            painter.drawEllipse(display_point, 10, 10)
+            painter.drawEllipse(display_point, self.POINT_RADIUS, self.POINT_RADIUS)
             
             # 绘制标签
             painter.setPen(QPen(Qt.GlobalColor.white))
             painter.drawText(display_point.x() - 5, display_point.y() + 5, label)
             
+    def draw_tiles(self, painter, dirty_rect):
+        """绘制与重绘区域相交的图块（按当前显示比例选择金字塔层级）"""
+        level = self.pyramid.level_for_scale(self.scale)
+        level_h, level_w = self.pyramid.level(level).shape[:2]
+        factor_x, factor_y = self.pyramid.level_factor(level)
+        
+        # 层级像素放大显示时保持像素清晰，缩小时平滑
+        if self.scale * factor_x < 1.0:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            
+        # 重绘区域对应的层级像素范围
+        offset_x = self.image_offset.x()
+        offset_y = self.image_offset.y()
+        x0 = max(0, math.floor((dirty_rect.left() - offset_x) / self.scale / factor_x))
+        y0 = max(0, math.floor((dirty_rect.top() - offset_y) / self.scale / factor_y))
+        x1 = min(level_w, math.ceil((dirty_rect.right() + 1 - offset_x) / self.scale / factor_x))
+        y1 = min(level_h, math.ceil((dirty_rect.bottom() + 1 - offset_y) / self.scale / factor_y))
+        if x0 >= x1 or y0 >= y1:
+            return
+            
+        # 图块边缘与ROI框使用相同的坐标映射，相邻图块之间没有缝隙
+        def edge_x(level_x):
+            return math.floor(level_x * factor_x * self.scale) + offset_x
+            
+        def edge_y(level_y):
+            return math.floor(level_y * factor_y * self.scale) + offset_y
+            
+        size = self.TILE_SIZE
+        for ty in range(y0 // size, (y1 - 1) // size + 1):
+            top = edge_y(ty * size)
+            bottom = edge_y(min((ty + 1) * size, level_h))
+            for tx in range(x0 // size, (x1 - 1) // size + 1):
+                left = edge_x(tx * size)
+                right = edge_x(min((tx + 1) * size, level_w))
+                painter.drawPixmap(
+                    QRect(left, top, right - left, bottom - top),
+                    self.get_tile(level, tx, ty)
+                )
+                
+    def get_tile(self, level, tx, ty):
+        """获取图块的QPixmap（LRU缓存，只在首次显示时转换）"""
+        key = (level, tx, ty)
+        pixmap = self.tile_cache.get(key)
+        if pixmap is not None:
+            self.tile_cache.move_to_end(key)
+            return pixmap
+            
+        tile = self.pyramid.tile(level, tx, ty, self.TILE_SIZE)
+        pixmap = QPixmap.fromImage(tile.to_qimage())
+        self.tile_cache[key] = pixmap
+        while len(self.tile_cache) > self.TILE_CACHE_SIZE:
+            self.tile_cache.popitem(last=False)
+        return pixmap
+        
+    def roi_widget_rect(self):
+        """当前ROI框（含绘制中的临时框）在widget中的重绘区域"""
+        if self.roi_rect:
+            rect = self.roi_rect
+        elif self.roi_start and self.temp_roi_end:
+            rect = QRect(self.roi_start, self.temp_roi_end).normalized()
+        else:
+            return QRect()
+            
+        margin = self.OVERLAY_MARGIN
+        return self.image_to_widget_rect(rect).adjusted(-margin, -margin, margin, margin)
+        
+    def point_rect(self, point):
+        """标记点在widget中的重绘区域"""
+        center = self.image_to_widget_point(point)
+        r = self.POINT_RADIUS + self.OVERLAY_MARGIN
+        return QRect(center.x() - r, center.y() - r, 2 * r + 1, 2 * r + 1)
+        
     def image_to_widget_point(self, image_point):
-        """将原图坐标转换为widget坐标"""
-        wx = int(image_point.x() * self.scale) + self.image_offset.x()
-        wy = int(image_point.y() * self.scale) + self.image_offset.y()
+        """将原图坐标转换为widget坐标（原图像素中心所在的widget像素）"""
+        wx = math.floor((image_point.x() + 0.5) * self.scale) + self.image_offset.x()
+        wy = math.floor((image_point.y() + 0.5) * self.scale) + self.image_offset.y()
         return QPoint(wx, wy)
         
     def image_to_widget_rect(self, image_rect):
-        """将原图矩形转换为widget矩形"""
-        top_left = self.image_to_widget_point(image_rect.topLeft())
-        w = int(image_rect.width() * self.scale)
-        h = int(image_rect.height() * self.scale)
-        return QRect(top_left.x(), top_left.y(), w, h)
+        """将原图矩形转换为widget矩形（按像素边缘映射，与图像绘制一致）"""
+        left = math.floor(image_rect.x() * self.scale)
+        top = math.floor(image_rect.y() * self.scale)
+        right = math.floor((image_rect.x() + image_rect.width()) * self.scale)
+        bottom = math.floor((image_rect.y() + image_rect.height()) * self.scale)
+        return QRect(
+            left + self.image_offset.x(), top + self.image_offset.y(),
+            right - left, bottom - top
+        )
         
     def widget_to_image_point(self, widget_point):
-        """将widget坐标转换为原图坐标"""
+        """将widget坐标转换为原图坐标（widget像素中心所在的原图像素）
+
+        放大显示时与 image_to_widget_point 互逆。
+        """
         if self.original_image is None:
             return None
             
-        # 减去偏移
-        x = widget_point.x() - self.image_offset.x()
-        y = widget_point.y() - self.image_offset.y()
+        # 减去偏移，按像素中心换算为原图坐标
+        img_x = math.floor((widget_point.x() - self.image_offset.x() + 0.5) / self.scale)
+        img_y = math.floor((widget_point.y() - self.image_offset.y() + 0.5) / self.scale)
         
         # 检查是否在图像范围内
-        display_w = int(self.original_image.shape[1] * self.scale)
-        display_h = int(self.original_image.shape[0] * self.scale)
-        
-        if x < 0 or x >= display_w or y < 0 or y >= display_h:
+        img_h, img_w = self.original_image.shape[:2]
+        if img_x < 0 or img_x >= img_w or img_y < 0 or img_y >= img_h:
             return None
             
-        # 转换为原图坐标
-        img_x = int(x / self.scale)
-        img_y = int(y / self.scale)
-        
-        # 确保在原图范围内
-        img_h, img_w = self.original_image.shape[:2]
-        img_x = max(0, min(img_x, img_w - 1))
-        img_y = max(0, min(img_y, img_h - 1))
-        
         return QPoint(img_x, img_y)
         
+    def wheelEvent(self, event: QWheelEvent):
+        """滚轮缩放（以光标位置为中心）"""
+        if self.original_image is None:
+            return
+            
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self.zoom * self.ZOOM_STEP ** steps, event.position().toPoint())
+        event.accept()
+        
     def mousePressEvent(self, event: QMouseEvent):
         if self.original_image is None:
             return
             
+        if event.button() == Qt.MouseButton.MiddleButton:
+            # 中键拖动平移
+            self.pan_start = event.pos()
+            self.pan_start_offset = self.image_offset
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+            return
+            
         image_pos = self.widget_to_image_point(event.pos())
         if image_pos is None:
             return
@@ -191,11 +386,12 @@ class ImageCanvas(QWidget):
         if self.mode == "roi":
             # ROI绘制模式 - 只响应左键
             if event.button() == Qt.MouseButton.LeftButton:
+                old_rect = self.roi_widget_rect()
                 self.is_drawing_roi = True
                 self.roi_start = image_pos
                 self.temp_roi_end = image_pos
                 self.roi_rect = None
-                self.update()
+                self.update(old_rect.united(self.roi_widget_rect()))
                 
         elif self.mode == "point":
             # 标记点模式 - 必须在ROI内
@@ -203,25 +399,38 @@ class ImageCanvas(QWidget):
                 if event.button() == Qt.MouseButton.LeftButton:
                     # 左键 = 红点（疏除）
                     self.points.append((image_pos, "remove"))
-                    self.update()
+                    self.update(self.point_rect(image_pos))
                 elif event.button() == Qt.MouseButton.RightButton:
                     # 右键 = 绿点（保留）
                     self.points.append((image_pos, "keep"))
-                    self.update()
+                    self.update(self.point_rect(image_pos))
                     
     def mouseMoveEvent(self, event: QMouseEvent):
         if self.original_image is None:
             return
             
+        if self.pan_start is not None:
+            self.set_offset(self.pan_start_offset + event.pos() - self.pan_start)
+            self.update()
+            return
+            
         if self.is_drawing_roi:
             image_pos = self.widget_to_image_point(event.pos())
             if image_pos:
+                # 只重绘新旧ROI框覆盖的区域
+                old_rect = self.roi_widget_rect()
                 self.temp_roi_end = image_pos
-                self.update()
+                self.update(old_rect.united(self.roi_widget_rect()))
                 
     def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() == Qt.MouseButton.MiddleButton and self.pan_start is not None:
+            self.pan_start = None
+            self.setCursor(Qt.CursorShape.CrossCursor)
+            return
+            
         if event.button() == Qt.MouseButton.LeftButton and self.is_drawing_roi:
             self.is_drawing_roi = False
+            old_rect = self.roi_widget_rect()
             
             if self.roi_start and self.temp_roi_end:
                 # 创建并规范化矩形
@@ -234,13 +443,13 @@ class ImageCanvas(QWidget):
                     self.roi_rect = None
                     
             self.temp_roi_end = None
-            self.update()
+            self.update(old_rect.united(self.roi_widget_rect()))
             
     def undo_point(self):
         """撤销上一个点"""
         if self.points:
-            self.points.pop()
-            self.update()
+            point, _ = self.points.pop()
+            self.update(self.point_rect(point))
             return True
         return False
         
@@ -300,37 +509,8 @@ class ImageCanvas(QWidget):
         w = min(w, img_w - x)
         h = min(h, img_h - y)
         
-        roi_image = self.original_image[y:y+h, x:x+w].copy()
-        
-        # 在ROI图像上绘制点
-        for point, point_type in self.points:
-            if self.roi_rect.contains(point):
-                # 转换为ROI内的坐标
-                px = point.x() - x
-                py = point.y() - y
-                
-                if point_type == "remove":
-                    # 红点 - 疏除
-                    color = (68, 68, 255)  # BGR: 红色
-                    label = "X"
-                else:
-                    # 绿点 - 保留
-                    color = (68, 255, 68)  # BGR: 绿色
-                    label = "O"
-                    
-                # 绘制圆点
-                cv2.circle(roi_image, (px, py), 10, color, -1)
-                cv2.circle(roi_image, (px, py), 10, (0, 0, 0), 2)
-                
-                # 绘制标签文字
-                cv2.putText(
-                    roi_image, label, 
-                    (px - 6, py + 6),
-                    cv2.FONT_HERSHEY_SIMPLEX, 
-                    0.5, (255, 255, 255), 2
-                )
-                
-        return roi_image
+        # 与查看、导出时按元数据绘制的参考图使用同一绘制函数
+        return draw_points(self.original_image[y:y+h, x:x+w], self.get_points_data())
         
     def get_points_data(self):
         """获取标记点数据"""
@@ -364,6 +544,7 @@ class AnnotationWidget(QWidget):
         self.config_manager = config_manager
         self.video_name = ""
         self.frame_number = 0
+        self.frame_pts = None   # 帧的显示时间戳(ms)
         
         self.setup_ui()
         
@@ -381,7 +562,7 @@ class AnnotationWidget(QWidget):
             "操作说明：\n"
             "1. 鼠标左键拖拽画出ROI区域\n"
             "2. 在ROI内：左键=红点(疏除)，右键=绿点(保留)\n"
-            "3. 滚轮可缩放查看"
+            "3. 滚轮可缩放查看，按住中键拖动平移"
         )
         self.tip_label.setStyleSheet(
             "color: #aaa; font-size: 11px; background: #363636; "
@@ -461,15 +642,24 @@ class AnnotationWidget(QWidget):
         """兼容接口 - 本版本使用固定的红绿点"""
         pass
         
-    def set_frame(self, frame, video_name, frame_number):
-        """设置要标注的帧"""
+    def set_frame(self, frame, video_name, frame_number, frame_pts=None):
+        """设置要标注的帧（frame_pts 为帧的显示时间戳，随标注保存以便精确还原）"""
         self.video_name = video_name
         self.frame_number = frame_number
+        self.frame_pts = frame_pts
         self.canvas.set_image(frame)
         self.comment_input.clear()
         self.status_label.setText(f"来源: {video_name} | 帧号: {frame_number}")
         self.update_stats()
         
+    def replace_frame(self, frame, frame_number, frame_pts=None):
+        """换成同一视频的另一帧，保留已画的ROI、标记点和注释"""
+        self.frame_number = frame_number
+        self.frame_pts = frame_pts
+        self.canvas.replace_image(frame)
+        self.status_label.setText(f"来源: {self.video_name} | 帧号: {frame_number}")
+        self.update_stats()
+        
     def undo_point(self):
         """撤销上一个点"""
         if self.canvas.undo_point():
@@ -506,8 +696,12 @@ class AnnotationWidget(QWidget):
             
         # 获取图像
         roi_image = self.canvas.get_roi_image()
-        roi_image_with_points = self.canvas.get_roi_image_with_points()
         
+        # overlay模式下不保存参考图，无需绘制
+        roi_image_with_points = None
+        if self.config_manager is None or self.config_manager.get_reference_mode() != "overlay":
+            roi_image_with_points = self.canvas.get_roi_image_with_points()
+            
         if roi_image is None:
             self.show_message("获取ROI图像失败！", "error")
             return
@@ -520,6 +714,7 @@ class AnnotationWidget(QWidget):
             "image_id": image_id,
             "source_video": self.video_name,
             "frame_number": self.frame_number,
+            "pts_ms": self.frame_pts,
             "roi_coords": [roi_rect.x(), roi_rect.y(), roi_rect.width(), roi_rect.height()],
             "comment": self.comment_input.toPlainText(),
             "points": self.canvas.get_points_data(),
@@ -527,8 +722,9 @@ class AnnotationWidget(QWidget):
             "roi_image_with_points": roi_image_with_points
         }
         
+        # 先显示提交成功，保存请求被拒绝时由接收方改为提示
+        self.show_message("✓ 标注已提交保存！", "success")
         self.save_requested.emit(save_data)
-        self.show_message("✓ 标注已保存！", "success")
         
     def show_message(self, text, msg_type="info"):
         """显示消息"""
@@ -0,0 +1,80 @@
+"""
+胶片条组件 - 进度条下方按时间排列的缩略图
+"""
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import QPainter, QPixmap, QColor
+
+from app.utils.frame_buffer import FrameBuffer
+
+
+class FilmstripWidget(QWidget):
+    """胶片条显示
+
+    与进度条的滑槽对齐：每个格子显示其中心位置对应帧的缩略图。
+    绘制结果缓存为一张QPixmap，尺寸变化或有新缩略图生成后才重建。
+    """
+    
+    STRIP_HEIGHT = 40
+    BACKGROUND = QColor("#1a1a1a")
+    
+    def __init__(self, slider, parent=None):
+        super().__init__(parent)
+        self.slider = slider        # MarkerSlider，用于与滑槽对齐
+        self.filmstrip = None
+        self.strip_pixmap = None
+        self.setFixedHeight(self.STRIP_HEIGHT)
+        
+    def set_filmstrip(self, filmstrip):
+        """设置胶片条（None表示清空）"""
+        self.filmstrip = filmstrip
+        self.refresh()
+        
+    def refresh(self):
+        """有新缩略图后重建绘制缓存"""
+        self.strip_pixmap = None
+        self.update()
+        
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.strip_pixmap = None
+        
+    def paintEvent(self, event):
+        if self.strip_pixmap is None or self.strip_pixmap.size() != self.size():
+            self.strip_pixmap = self.render_strip()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.strip_pixmap)
+        painter.end()
+        
+    def render_strip(self):
+        """按当前尺寸绘制整条缩略图"""
+        pixmap = QPixmap(self.size())
+        pixmap.fill(self.BACKGROUND)
+        filmstrip = self.filmstrip
+        maximum = self.slider.maximum()
+        if filmstrip is None or not filmstrip.count or maximum <= 0:
+            return pixmap
+            
+        # 滑槽两端对应的横坐标（进度条与本组件在同一布局中，换算到本组件坐标）
+        option = self.slider.style_option()
+        offset = self.slider.x() - self.x()
+        x0 = self.slider.value_to_x(0, option) + offset
+        x1 = self.slider.value_to_x(maximum, option) + offset
+        
+        thumb_w, thumb_h = filmstrip.thumb_size
+        tile_h = self.height()
+        tile_w = max(8, round(thumb_w * tile_h / thumb_h))
+        
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        x = x0 - tile_w // 2
+        while x < x1 + tile_w // 2:
+            center = min(max(x + tile_w // 2, x0), x1)
+            frame_number = round((center - x0) / max(1, x1 - x0) * maximum)
+            thumbnail = filmstrip.thumbnail(frame_number)
+            if thumbnail is not None:
+                image = FrameBuffer(thumbnail).to_qimage()
+                painter.drawImage(QRect(x, 0, tile_w - 1, tile_h), image)
+            x += tile_w
+        painter.end()
+        return pixmap
@@ -0,0 +1,117 @@
+"""
+带标记的进度条 - 在滑槽上显示候选关键帧，点击标记直接跳转
+"""
+from PyQt6.QtWidgets import QSlider, QStyle, QStyleOptionSlider
+from PyQt6.QtCore import pyqtSignal, Qt
+from PyQt6.QtGui import QPainter, QColor, QPen
+
+import bisect
+
+
+class MarkerSlider(QSlider):
+    """带候选帧标记的水平进度条"""
+    
+    # 点击了某个标记: 帧号
+    marker_clicked = pyqtSignal(int)
+    # 鼠标悬停: 对应的帧号, 横坐标；离开时发出 hover_left
+    hover_moved = pyqtSignal(int, int)
+    hover_left = pyqtSignal()
+    
+    MARKER_COLOR = QColor("#ff9800")
+    CLICK_TOLERANCE = 4         # 点击位置与标记的最大距离(像素)
+    
+    def __init__(self, orientation=Qt.Orientation.Horizontal, parent=None):
+        super().__init__(orientation, parent)
+        self.markers = []       # 升序帧号
+        self.setMouseTracking(True)
+        
+    def set_markers(self, frames):
+        """设置标记的帧号"""
+        self.markers = sorted(frames)
+        self.update()
+        
+    def next_marker(self, value):
+        """value 之后的第一个标记，没有则返回None"""
+        i = bisect.bisect_right(self.markers, value)
+        return self.markers[i] if i < len(self.markers) else None
+        
+    def prev_marker(self, value):
+        """value 之前的最后一个标记，没有则返回None"""
+        i = bisect.bisect_left(self.markers, value)
+        return self.markers[i - 1] if i > 0 else None
+        
+    def style_option(self):
+        option = QStyleOptionSlider()
+        self.initStyleOption(option)
+        return option
+        
+    def value_to_x(self, value, option):
+        """帧号对应的滑槽横坐标（与滑块中心对齐）"""
+        style = self.style()
+        groove = style.subControlRect(
+            QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderGroove, self
+        )
+        handle = style.subControlRect(
+            QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderHandle, self
+        )
+        span = max(1, groove.width() - handle.width())
+        offset = QStyle.sliderPositionFromValue(
+            self.minimum(), self.maximum(), value, span, option.upsideDown
+        )
+        return groove.x() + handle.width() // 2 + offset
+        
+    def x_to_value(self, x, option):
+        """滑槽横坐标对应的帧号"""
+        style = self.style()
+        groove = style.subControlRect(
+            QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderGroove, self
+        )
+        handle = style.subControlRect(
+            QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderHandle, self
+        )
+        span = max(1, groove.width() - handle.width())
+        return QStyle.sliderValueFromPosition(
+            self.minimum(), self.maximum(), x - groove.x() - handle.width() // 2,
+            span, option.upsideDown
+        )
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.markers or self.maximum() <= self.minimum():
+            return
+            
+        option = self.style_option()
+        painter = QPainter(self)
+        painter.setPen(QPen(self.MARKER_COLOR, 2))
+        top, bottom = 2, self.height() - 3
+        for frame_number in self.markers:
+            x = self.value_to_x(frame_number, option)
+            painter.drawLine(x, top, x, bottom)
+        painter.end()
+        
+    def mousePressEvent(self, event):
+        """点击标记附近时跳转到该标记（点击滑块本身仍为拖动）"""
+        if event.button() == Qt.MouseButton.LeftButton and self.markers and self.isEnabled():
+            option = self.style_option()
+            handle = self.style().subControlRect(
+                QStyle.ComplexControl.CC_Slider, option, QStyle.SubControl.SC_SliderHandle, self
+            )
+            pos = event.position().toPoint()
+            if not handle.contains(pos):
+                nearest = min(self.markers, key=lambda m: abs(self.value_to_x(m, option) - pos.x()))
+                if abs(self.value_to_x(nearest, option) - pos.x()) <= self.CLICK_TOLERANCE:
+                    self.marker_clicked.emit(nearest)
+                    event.accept()
+                    return
+                    
+        super().mousePressEvent(event)
+        
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if self.isEnabled() and self.maximum() > self.minimum():
+            x = event.position().toPoint().x()
+            self.hover_moved.emit(self.x_to_value(x, self.style_option()), x)
+            
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        self.hover_left.emit()
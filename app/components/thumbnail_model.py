@@ -0,0 +1,168 @@
+"""
+缩略图列表模型 - 审阅对话框的标注列表，只为可见行在后台加载缩略图
+"""
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QIcon, QPixmap
+
+import bisect
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.frame_buffer import FrameBuffer
+from app.utils.thumbnail_cache import ThumbnailCache
+
+
+class ThumbnailListModel(QAbstractListModel):
+    """标注缩略图列表模型
+
+    每行是一个标注（图像ID和文件名）。视图只为可见行请求图标，
+    此时才把加载任务交给工作线程池；后请求的先加载，快速滚动时优先显示当前可见的行。
+    加载完成的缩略图保存在内存LRU中，磁盘缓存由 ThumbnailCache 负责。
+    """
+    
+    # 工作线程加载完成: 图像ID, QImage（None表示加载失败）
+    thumbnail_loaded = pyqtSignal(str, object)
+    
+    IMAGE_ID_ROLE = Qt.ItemDataRole.UserRole
+    
+    MAX_PIXMAPS = 1000      # 内存中最多保留的缩略图数
+    
+    def __init__(self, annotation_manager, size=150, workers=4, parent=None):
+        super().__init__(parent)
+        
+        self.size = size
+        self.thumbnail_cache = ThumbnailCache(annotation_manager, size)
+        self.items = []             # [(图像ID, 文件名), ...]
+        self.rows = {}              # 图像ID -> 行号
+        self.pixmaps = OrderedDict()
+        self.failed = set()
+        
+        # 待加载的图像ID（后进先出）
+        self.requested = set()
+        self.request_stack = []
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        
+        self.placeholder = QPixmap(size, size)
+        self.placeholder.fill(QColor("#e0e0e0"))
+        
+        self.thumbnail_loaded.connect(self.on_thumbnail_loaded)
+        
+    def set_items(self, items):
+        """设置标注列表 [(图像ID, 文件名), ...]"""
+        self.beginResetModel()
+        self.items = list(items)
+        self.rows = {image_id: row for row, (image_id, _) in enumerate(self.items)}
+        self.endResetModel()
+        
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.items)
+        
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+            
+        image_id, filename = self.items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return filename
+        if role == self.IMAGE_ID_ROLE:
+            return image_id
+        if role == Qt.ItemDataRole.DecorationRole:
+            pixmap = self.pixmaps.get(image_id)
+            if pixmap is not None:
+                self.pixmaps.move_to_end(image_id)
+                return QIcon(pixmap)
+            if image_id not in self.failed:
+                self.request_thumbnail(image_id)
+            return QIcon(self.placeholder)
+        return None
+        
+    def request_thumbnail(self, image_id):
+        """请求在后台加载缩略图"""
+        with self.lock:
+            if image_id in self.requested:
+                return
+            self.requested.add(image_id)
+            self.request_stack.append(image_id)
+        self.executor.submit(self.load_next)
+        
+    def load_next(self):
+        """工作线程: 加载最近请求的一张缩略图"""
+        with self.lock:
+            if not self.request_stack:
+                return
+            image_id = self.request_stack.pop()
+            
+        image = None
+        try:
+            thumbnail = self.thumbnail_cache.load(image_id)
+            if thumbnail is not None:
+                # QImage可跨线程传递；复制一份使其拥有数据
+                image = FrameBuffer(thumbnail).to_qimage().copy()
+        except Exception as e:
+            print(f"加载缩略图失败: {e}")
+            
+        try:
+            self.thumbnail_loaded.emit(image_id, image)
+        except RuntimeError:
+            # 模型已销毁
+            pass
+            
+    def on_thumbnail_loaded(self, image_id, image):
+        """界面线程: 保存缩略图并刷新对应行"""
+        with self.lock:
+            self.requested.discard(image_id)
+            
+        if image is None:
+            self.failed.add(image_id)
+        else:
+            self.pixmaps[image_id] = QPixmap.fromImage(image)
+            while len(self.pixmaps) > self.MAX_PIXMAPS:
+                self.pixmaps.popitem(last=False)
+                
+        row = self.rows.get(image_id)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+            
+    def add_image(self, image_id, filename):
+        """按图像ID顺序插入一个标注；已存在时刷新其缩略图"""
+        if image_id in self.rows:
+            self.refresh_image(image_id)
+            return
+            
+        row = bisect.bisect_left([item_id for item_id, _ in self.items], image_id)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.insert(row, (image_id, filename))
+        self.rows = {item_id: i for i, (item_id, _) in enumerate(self.items)}
+        self.endInsertRows()
+        
+    def refresh_image(self, image_id):
+        """标注被覆盖后丢弃内存中的缩略图，下次显示时重新加载"""
+        self.pixmaps.pop(image_id, None)
+        self.failed.discard(image_id)
+        row = self.rows.get(image_id)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+            
+    def remove_image(self, image_id):
+        """从列表中移除一个标注"""
+        row = self.rows.get(image_id)
+        if row is None:
+            return
+            
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.items[row]
+        self.rows = {item_id: i for i, (item_id, _) in enumerate(self.items)}
+        self.pixmaps.pop(image_id, None)
+        self.endRemoveRows()
+        
+    def shutdown(self):
+        """取消未开始的加载任务并等待正在进行的任务结束"""
+        with self.lock:
+            self.request_stack.clear()
+        self.executor.shutdown(wait=True, cancel_futures=True)
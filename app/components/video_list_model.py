@@ -0,0 +1,318 @@
+"""
+视频列表模型 - 视频库扫描结果的列表模型，以及基于搜索索引的过滤代理
+"""
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+import os
+import bisect
+import numpy as np
+
+from app.utils.search_index import SearchIndex
+from app.utils.annotation_store import video_key
+
+
+def describe_video(entry):
+    """视频元数据的简短描述（用作列表项的提示）"""
+    if not entry.get("readable"):
+        return f"{entry['name']}\n无法读取视频信息"
+    fps = entry["fps"]
+    seconds = int(entry["frame_count"] / fps) if fps > 0 else 0
+    return (
+        f"{entry['name']}\n"
+        f"{entry['width']}×{entry['height']}  |  {fps:.2f} fps  |  "
+        f"{seconds // 60:02d}:{seconds % 60:02d}  |  {entry['codec'] or '未知编码'}\n"
+        f"{entry['size'] / (1024 * 1024):.1f} MB"
+    )
+
+
+class VideoListModel(QAbstractListModel):
+    """视频列表模型
+
+    行按加入顺序排列且不再移动，因此 路径 -> 行号 的字典只需追加；排序和过滤由 VideoFilterProxyModel 负责。
+    每行的相对路径同时加入搜索索引，索引编号即行号。
+    标注进度（标注数、最后标注的帧等）来自标注存储的视频汇总。标注记录只含视频的文件名，
+    汇总按 video_key（文件名）对应到行，不同目录下的同名视频共用同一份汇总（图像ID本来就相同）。
+    """
+    
+    PATH_ROLE = Qt.ItemDataRole.UserRole
+    
+    PROCESSED_COLOR = QColor("#28a745")
+    UNREADABLE_COLOR = QColor("#999")
+    
+    # 标注进度变化时需要刷新的角色
+    STATS_ROLES = [
+        Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.ToolTipRole
+    ]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        
+        self.entries = []           # 扫描记录（含 path 和 name）
+        self.keys = []              # 排序键 (相对路径, 路径)
+        self.rows = {}              # 规范路径 -> 行号
+        self.video_rows = {}        # 标注键 -> [行号]
+        self.video_stats = {}       # 标注键 -> 标注汇总
+        self.marked = set()         # 手动标记为已处理的标注键
+        self.processed_rows = set()  # 列表中已处理视频的行号
+        self.search_index = SearchIndex()
+        
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.entries)
+        
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+            
+        row = index.row()
+        entry = self.entries[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if row not in self.processed_rows:
+                return entry["name"]
+            stats = self.video_stats.get(entry["video"])
+            if stats is None:
+                return f"✓ {entry['name']}"
+            return f"✓ {entry['name']}  ({stats['count']})"
+        if role == self.PATH_ROLE:
+            return entry["path"]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.describe(entry)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if row in self.processed_rows:
+                return self.PROCESSED_COLOR
+            if not entry.get("readable"):
+                return self.UNREADABLE_COLOR
+        return None
+        
+    def describe(self, entry):
+        """提示文字: 视频信息和标注进度"""
+        text = describe_video(entry)
+        stats = self.video_stats.get(entry["video"])
+        if stats is not None:
+            last_frame = stats["last_frame"]
+            text += (
+                f"\n已标注 {stats['count']} 张"
+                + (f"，最后标注第 {last_frame + 1} 帧" if last_frame is not None else "")
+                + f"\n保留点 {stats['keep_count']}  |  去除点 {stats['remove_count']}"
+            )
+        return text
+        
+    def clear(self):
+        """清空列表（标注进度和已处理标记保留）"""
+        self.beginResetModel()
+        self.entries = []
+        self.keys = []
+        self.rows = {}
+        self.video_rows = {}
+        self.processed_rows = set()
+        self.search_index.clear()
+        self.endResetModel()
+        
+    def add_videos(self, entries):
+        """在末尾追加一批视频，已存在的路径忽略"""
+        new_entries = []
+        for entry in entries:
+            key = os.path.normcase(os.path.abspath(entry["path"]))
+            if key not in self.rows:
+                self.rows[key] = len(self.entries) + len(new_entries)
+                new_entries.append(dict(entry, key=key, video=video_key(entry["path"])))
+        if not new_entries:
+            return
+            
+        first = len(self.entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_entries) - 1)
+        for row, entry in enumerate(new_entries, first):
+            self.entries.append(entry)
+            self.keys.append((entry["name"], entry["path"]))
+            self.search_index.add(entry["name"])
+            self.video_rows.setdefault(entry["video"], []).append(row)
+            if self.is_processed(entry["video"]):
+                self.processed_rows.add(row)
+        self.endInsertRows()
+        
+    def row_of(self, video_path):
+        """视频所在的行号，不在列表中时返回None"""
+        return self.rows.get(os.path.normcase(os.path.abspath(video_path)))
+        
+    def is_processed(self, video):
+        """标注键对应的视频是否已处理（有标注或手动标记过）"""
+        return video in self.video_stats or video in self.marked
+        
+    def processed_count(self):
+        """列表中已处理的视频数"""
+        return len(self.processed_rows)
+        
+    def set_processed(self, video_path):
+        """手动标记视频为已处理"""
+        video = video_key(video_path)
+        self.marked.add(video)
+        self.refresh_rows(video)
+        
+    def set_video_stats(self, video_stats):
+        """设置全部视频的标注汇总 {标注键: 汇总}"""
+        self.video_stats = dict(video_stats)
+        self.processed_rows = {
+            row for video, rows in self.video_rows.items() if self.is_processed(video)
+            for row in rows
+        }
+        if self.entries:
+            self.dataChanged.emit(self.index(0), self.index(len(self.entries) - 1), self.STATS_ROLES)
+            
+    def update_video_stats(self, video_path, stats):
+        """更新一个视频的标注汇总（视频为路径或 source_video；None表示已没有标注）"""
+        video = video_key(video_path)
+        if stats is None:
+            self.video_stats.pop(video, None)
+        else:
+            self.video_stats[video] = stats
+        self.refresh_rows(video)
+        
+    def refresh_rows(self, video):
+        """重新判断标注键对应的各行是否已处理并刷新显示"""
+        processed = self.is_processed(video)
+        for row in self.video_rows.get(video, ()):
+            if processed:
+                self.processed_rows.add(row)
+            else:
+                self.processed_rows.discard(row)
+            index = self.index(row)
+            self.dataChanged.emit(index, index, self.STATS_ROLES)
+
+
+class VideoFilterProxyModel(QAbstractListModel):
+    """按相对路径排序并按搜索词过滤的代理模型
+
+    不使用逐行回调的 QSortFilterProxyModel：过滤时一次查询搜索索引得到匹配的行，
+    再按预先维护好的全局顺序取出，整个过程不为每一行调用Python函数。
+    基类用 QAbstractListModel 而不是 QAbstractProxyModel，index() 保持C++实现，
+    视图重新布局时不会为每一行回调Python；数据按行转发给源模型。
+    源模型追加的行按排序键插入到对应位置。
+    """
+    
+    # 匹配的行少于全部行的该比例时直接对匹配结果排序，否则按全局顺序筛选
+    SORT_MATCHES_RATIO = 8
+    # 源模型一次变化的行数超过该值时整体刷新
+    BULK_CHANGE_ROWS = 64
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        
+        self.source = None
+        self.filter_text = ""
+        self.order = []             # 全部源行号，按排序键升序
+        self.order_keys = []
+        self.order_array = None     # order 的数组形式，过滤时使用，插入新行后重建
+        self.visible = []           # 当前显示的源行号（order 的子序列）
+        
+    def setSourceModel(self, model):
+        if self.source is not None:
+            self.source.rowsInserted.disconnect(self.on_rows_inserted)
+            self.source.modelReset.disconnect(self.rebuild)
+            self.source.dataChanged.disconnect(self.on_data_changed)
+        self.source = model
+        model.rowsInserted.connect(self.on_rows_inserted)
+        model.modelReset.connect(self.rebuild)
+        model.dataChanged.connect(self.on_data_changed)
+        self.rebuild()
+        
+    def sourceModel(self):
+        return self.source
+        
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.visible)
+        
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.source.data(self.mapToSource(index), role)
+        
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.source.index(self.visible[proxy_index.row()])
+        
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = self.visible_row(source_index.row())
+        return QModelIndex() if row is None else self.index(row)
+        
+    def visible_row(self, source_row):
+        """源行在当前显示中的行号（二分查找），被过滤掉时返回None"""
+        keys = self.source.keys
+        row = bisect.bisect_left(self.visible, keys[source_row], key=keys.__getitem__)
+        if row < len(self.visible) and self.visible[row] == source_row:
+            return row
+        return None
+        
+    def set_filter(self, text):
+        """设置搜索文本并重新过滤"""
+        self.filter_text = text
+        self.beginResetModel()
+        self.apply_filter()
+        self.endResetModel()
+        
+    def apply_filter(self):
+        """根据搜索索引计算显示的行"""
+        source = self.source
+        matches = source.search_index.search(self.filter_text)
+        if matches is None:
+            self.visible = list(self.order)
+        elif len(matches) * self.SORT_MATCHES_RATIO < len(self.order):
+            self.visible = sorted(matches, key=source.keys.__getitem__)
+        else:
+            # 匹配很多时用掩码按全局顺序筛选，避免排序
+            if self.order_array is None:
+                self.order_array = np.asarray(self.order, dtype=np.int64)
+            mask = np.zeros(len(source.keys), dtype=bool)
+            mask[np.fromiter(matches, dtype=np.int64, count=len(matches))] = True
+            self.visible = self.order_array[mask[self.order_array]].tolist()
+            
+    def rebuild(self):
+        """源模型重置后重建全局顺序"""
+        self.beginResetModel()
+        source = self.source
+        self.order = sorted(range(source.rowCount()), key=source.keys.__getitem__)
+        self.order_keys = [source.keys[row] for row in self.order]
+        self.order_array = None
+        self.apply_filter()
+        self.endResetModel()
+        
+    def on_rows_inserted(self, parent, first, last):
+        """源模型追加了行：插入全局顺序，匹配当前搜索的行同时插入显示"""
+        source = self.source
+        if self.filter_text.strip():
+            matches = set(source.search_index.search(self.filter_text))
+        else:
+            matches = None
+            
+        self.order_array = None
+        keys = source.keys
+        for source_row in range(first, last + 1):
+            key = keys[source_row]
+            pos = bisect.bisect_left(self.order_keys, key)
+            self.order.insert(pos, source_row)
+            self.order_keys.insert(pos, key)
+            
+            if matches is not None and source_row not in matches:
+                continue
+            row = bisect.bisect_left(self.visible, key, key=keys.__getitem__)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.visible.insert(row, source_row)
+            self.endInsertRows()
+            
+    def on_data_changed(self, top_left, bottom_right, roles=()):
+        """转发源模型的数据变化（大范围变化时整体刷新，不逐行查找）"""
+        if bottom_right.row() - top_left.row() >= self.BULK_CHANGE_ROWS:
+            if self.visible:
+                self.dataChanged.emit(self.index(0), self.index(len(self.visible) - 1), roles)
+            return
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            row = self.visible_row(source_row)
+            if row is not None:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, roles)
@@ -2,25 +2,52 @@
 视频列表组件 - 显示和管理视频文件列表
 """
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QListWidget, QListWidgetItem,
-    QLabel, QLineEdit
+    QWidget, QVBoxLayout, QListView, QLabel, QLineEdit
 )
-from PyQt6.QtCore import pyqtSignal, Qt
-from PyQt6.QtGui import QColor
+from PyQt6.QtCore import pyqtSignal
 
 import os
 
+from app.components.video_list_model import VideoListModel, VideoFilterProxyModel
+from app.threads.library_thread import LibraryScanThread
+
 
 class VideoListWidget(QWidget):
-    """视频列表组件"""
+    """视频列表组件
+
+    目录（包括子目录）由后台线程扫描，边扫描边加入列表。
+    列表使用模型/视图：排序和搜索由基于搜索索引的代理模型完成，按路径查找行为字典查询。
+    每个视频的标注进度取自标注存储的视频汇总，启动时一次读取，之后随保存和删除的通知更新。
+    """
     
     # 信号：当选择视频时发出
     video_selected = pyqtSignal(str)
+    # 标注变更（从标注存储的监听回调转发到界面线程）: 操作, 图像ID, 元数据
+    annotation_changed = pyqtSignal(str, object, object)
+    
+    # 视图每批布局的行数
+    LAYOUT_BATCH = 200
     
-    def __init__(self, parent=None):
+    def __init__(self, annotation_manager=None, parent=None):
         super().__init__(parent)
         self.video_dir = "./video"
-        self.processed_videos = set()
+        self.annotation_manager = annotation_manager
+        self.scanning = False
+        
+        self.model = VideoListModel(self)
+        self.proxy = VideoFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        
+        if self.annotation_manager is not None:
+            self.model.set_video_stats(self.annotation_manager.get_video_stats())
+            self.annotation_changed.connect(self.on_annotation_changed)
+            self.annotation_manager.add_listener(self.notify_annotation_changed)
+            
+        self.scanner = LibraryScanThread()
+        self.scanner.videos_found.connect(self.on_videos_found)
+        self.scanner.scan_finished.connect(self.on_scan_finished)
+        self.scanner.start()
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -39,22 +66,27 @@ class VideoListWidget(QWidget):
         layout.addWidget(self.search_input)
         
         # 视频列表
-        self.list_widget = QListWidget()
-        self.list_widget.itemClicked.connect(self.on_item_clicked)
-        self.list_widget.setStyleSheet("""
-            QListWidget::item {
+        self.list_view = QListView()
+        self.list_view.setModel(self.proxy)
+        # 行高一致，视图不必为每一行计算尺寸；分批布局，过滤后先显示第一屏
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.list_view.setBatchSize(self.LAYOUT_BATCH)
+        self.list_view.clicked.connect(self.on_item_clicked)
+        self.list_view.setStyleSheet("""
+            QListView::item {
                 padding: 8px;
                 border-bottom: 1px solid #eee;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #0078d4;
                 color: white;
             }
-            QListWidget::item:hover {
+            QListView::item:hover {
                 background-color: #e5f3ff;
             }
         """)
-        layout.addWidget(self.list_widget)
+        layout.addWidget(self.list_view)
         
         # 统计信息
         self.stats_label = QLabel("共 0 个视频")
@@ -65,63 +97,75 @@ class VideoListWidget(QWidget):
         self.load_videos(self.video_dir)
         
     def load_videos(self, directory):
-        """加载指定目录下的视频文件"""
+        """扫描指定目录（包括子目录）下的视频文件，结果分批加入列表"""
         self.video_dir = directory
-        self.list_widget.clear()
-        self.video_files = []
+        self.model.clear()
         
         if not os.path.exists(directory):
+            self.scanner.cancel()
+            self.scanning = False
+            self.update_stats()
             return
             
-        # 支持的视频格式
-        video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
-        
-        for filename in sorted(os.listdir(directory)):
-            if filename.lower().endswith(video_extensions):
-                filepath = os.path.join(directory, filename)
-                self.video_files.append((filename, filepath))
-                
-                item = QListWidgetItem(filename)
-                item.setData(Qt.ItemDataRole.UserRole, filepath)
-                
-                # 如果已处理，添加标记
-                if filepath in self.processed_videos:
-                    item.setText(f"✓ {filename}")
-                    item.setForeground(QColor("#28a745"))
-                    
-                self.list_widget.addItem(item)
-                
+        self.scanning = True
+        self.scanner.scan(directory)
+        self.update_stats()
+        
+    def on_videos_found(self, directory, entries):
+        """扫描线程找到一批视频"""
+        if directory != self.video_dir:
+            return
+        self.model.add_videos(entries)
+        self.update_stats()
+        
+    def on_scan_finished(self, directory, total, probed):
+        """扫描完成"""
+        if directory != self.video_dir:
+            return
+        self.scanning = False
         self.update_stats()
         
     def filter_videos(self, text):
-        """根据搜索文本过滤视频"""
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            item.setHidden(text.lower() not in item.text().lower())
-            
-    def on_item_clicked(self, item):
+        """根据搜索文本过滤视频（空白分隔的多个词都要匹配）"""
+        self.proxy.set_filter(text)
+        self.update_stats()
+        
+    def on_item_clicked(self, index):
         """处理点击事件"""
-        video_path = item.data(Qt.ItemDataRole.UserRole)
+        video_path = index.data(VideoListModel.PATH_ROLE)
         self.video_selected.emit(video_path)
         
     def mark_as_processed(self, video_path):
         """标记视频为已处理"""
-        self.processed_videos.add(video_path)
-        
-        # 更新列表显示
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == video_path:
-                filename = os.path.basename(video_path)
-                if not item.text().startswith("✓"):
-                    item.setText(f"✓ {filename}")
-                    item.setForeground(QColor("#28a745"))
-                break
-                
+        self.model.set_processed(video_path)
+        self.update_stats()
+        
+    def notify_annotation_changed(self, op, image_id, data):
+        """标注管理器的监听回调（可能在保存线程中），转发到界面线程"""
+        self.annotation_changed.emit(op, image_id, data)
+        
+    def on_annotation_changed(self, op, image_id, data):
+        """标注保存或删除后更新对应视频的进度，重新加载时整体刷新"""
+        if op == "reload":
+            self.model.set_video_stats(self.annotation_manager.get_video_stats())
+        elif data and data.get("source_video"):
+            video_path = data["source_video"]
+            self.model.update_video_stats(video_path, self.annotation_manager.get_video_stats(video_path))
         self.update_stats()
         
     def update_stats(self):
         """更新统计信息"""
-        total = self.list_widget.count()
-        processed = len(self.processed_videos)
-        self.stats_label.setText(f"共 {total} 个视频，已处理 {processed} 个")
+        total = self.model.rowCount()
+        processed = self.model.processed_count()
+        text = f"共 {total} 个视频，已处理 {processed} 个"
+        if self.proxy.rowCount() != total:
+            text += f"，显示 {self.proxy.rowCount()} 个"
+        if self.scanning:
+            text += "（正在扫描...）"
+        self.stats_label.setText(text)
+        
+    def shutdown(self):
+        """停止扫描线程，注销标注变更监听"""
+        self.scanner.stop()
+        if self.annotation_manager is not None:
+            self.annotation_manager.remove_listener(self.notify_annotation_changed)
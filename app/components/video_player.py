@@ -3,34 +3,111 @@
 """
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QSlider, QComboBox, QStyle
+    QPushButton, QComboBox, QStyle
 )
-from PyQt6.QtCore import pyqtSignal, Qt, QTimer
+from PyQt6.QtCore import pyqtSignal, Qt, QTimer, QPoint
 from PyQt6.QtGui import QImage, QPixmap, QKeyEvent
 
-import cv2
-import numpy as np
+from app.threads.video_thread import VideoReaderThread
+from app.threads.analysis_thread import VideoAnalysisThread
+from app.threads.filmstrip_thread import FilmstripThread
+from app.components.marker_slider import MarkerSlider
+from app.components.filmstrip_widget import FilmstripWidget
+from app.utils.frame_cache import FrameCache
+from app.utils.display_pipeline import DisplayPipeline
+from app.utils.frame_scores import frame_sharpness
+from app.utils.frame_buffer import FrameBuffer
+from app.utils.video_index import SeekIndex
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 
 class VideoPlayer(QWidget):
     """视频播放器组件"""
     
-    # 信号：发送帧到标注区
-    frame_sent = pyqtSignal(np.ndarray, int)
+    # 信号：发送帧到标注区（FrameBuffer，只读共享）
+    frame_sent = pyqtSignal(object, int)
+    # 信号：用附近更清晰的帧替换刚发送的帧
+    frame_replaced = pyqtSignal(object, int)
+    # 后台找到更清晰的附近帧: 发送序号, 帧号, 帧, 清晰度提升比例
+    sharper_frame_found = pyqtSignal(int, int, object, float)
+    
+    # 显示帧缓存预算(MB)，显示帧很小，足够覆盖预取窗口
+    DISPLAY_CACHE_MB = 64
+    # 附近帧清晰度至少高出该比例才推荐替换
+    SNAP_MIN_GAIN = 0.15
     
-    def __init__(self, parent=None):
+    def __init__(self, config_manager=None, parent=None):
         super().__init__(parent)
         
-        self.cap = None
+        self.config_manager = config_manager
+        self.video_path = None
         self.current_frame = None
         self.current_frame_number = 0
         self.total_frames = 0
         self.fps = 30
+        # 帧号与时间的换算（逐帧时间戳，可变帧率视频同样准确）
+        self.seek_index = SeekIndex()
         self.is_playing = False
         self.playback_speed = 1.0
+        self.play_direction = 1     # 1=正放, -1=倒放
+        
+        # 已请求但尚未解码完成的目标帧（逐帧/跳转基于它计算）
+        self.target_frame_number = 0
+        
+        # 拖动进度条时只预览（胶片条缩略图 + 关键帧），松开后才解码目标帧
+        self.filmstrip = None
+        self.scrub_preview = False  # 本次拖动是否显示过预览
+        # 关键帧预览同一时刻只有一个请求在解码，期间只记住最新的位置
+        self.preview_busy = False
+        self.pending_preview = None
+        
+        # 播放时钟与统计
+        self.play_start_time = 0.0
+        self.play_start_frame = 0
+        self.dropped_frames = 0     # 已解码但为追赶进度而跳过的帧
+        self.late_frames = 0        # 到点时解码尚未就绪的次数
+        self.step_requests = 0      # 暂停时的取帧请求数
+        self.prefetch_hits = 0      # 其中已被预取的次数
+        
+        # 解码帧缓存（界面线程与解码线程共享）
+        cache_mb = 512
+        self.prefetch_radius = 8
+        if self.config_manager is not None:
+            cache_mb = self.config_manager.get_frame_cache_mb()
+            self.prefetch_radius = self.config_manager.get_prefetch_frames()
+        self.frame_cache = FrameCache(cache_mb)
+        self.display_cache = FrameCache(self.DISPLAY_CACHE_MB)
+        
+        # 保持打开的解码器数；切换回来的视频从上次看到的帧继续
+        self.decoder_pool_size = 4
+        if self.config_manager is not None:
+            self.decoder_pool_size = self.config_manager.get_decoder_pool_size()
+        self.resume_frames = {}     # 视频路径 -> 离开时的帧号
+        
+        # 候选关键帧数（0 = 不分析）
+        self.suggested_frames = 20
+        if self.config_manager is not None:
+            self.suggested_frames = self.config_manager.get_suggested_frames()
+            
+        # 发送时查找附近更清晰的帧（在单独的线程中计算，发送本身不等待）
+        self.snap_mode = "suggest"
+        self.snap_radius = 3
+        if self.config_manager is not None:
+            self.snap_mode = self.config_manager.get_snap_mode()
+            self.snap_radius = self.config_manager.get_snap_radius()
+        self.snap_executor = ThreadPoolExecutor(max_workers=1)
+        self.snap_generation = 0    # 每次发送递增，过期的结果被丢弃
+        self.snap_candidate = None  # (帧号, 帧)
+        self.sharper_frame_found.connect(self.on_sharper_frame_found)
         
         self.setup_ui()
         self.setup_timer()
+        self.setup_reader()
+        self.setup_analyzer()
+        self.setup_filmstrip()
         
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -51,14 +128,26 @@ class VideoPlayer(QWidget):
         self.display_label.setText("请选择视频文件")
         layout.addWidget(self.display_label, 1)
         
-        # 进度条
-        self.progress_slider = QSlider(Qt.Orientation.Horizontal)
+        # 进度条（橙色标记为候选关键帧，点击标记跳转）
+        self.progress_slider = MarkerSlider(Qt.Orientation.Horizontal)
         self.progress_slider.setEnabled(False)
         self.progress_slider.sliderMoved.connect(self.seek_frame)
         self.progress_slider.sliderPressed.connect(self.on_slider_pressed)
         self.progress_slider.sliderReleased.connect(self.on_slider_released)
+        self.progress_slider.marker_clicked.connect(self.jump_to_frame)
+        self.progress_slider.hover_moved.connect(self.on_slider_hover)
+        self.progress_slider.hover_left.connect(self.hide_hover_preview)
         layout.addWidget(self.progress_slider)
         
+        # 胶片条和悬停预览
+        self.filmstrip_widget = FilmstripWidget(self.progress_slider)
+        layout.addWidget(self.filmstrip_widget)
+        
+        self.hover_preview = QLabel(self)
+        self.hover_preview.setStyleSheet("border: 1px solid #0078d4; background: #000;")
+        self.hover_preview.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.hover_preview.hide()
+        
         # 帧信息
         self.frame_info_label = QLabel("0 / 0")
         self.frame_info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -72,6 +161,11 @@ class VideoPlayer(QWidget):
         self.prev_frame_btn.setEnabled(False)
         control_layout1.addWidget(self.prev_frame_btn)
         
+        self.reverse_btn = QPushButton("◀ 倒放")
+        self.reverse_btn.clicked.connect(self.toggle_reverse_play)
+        self.reverse_btn.setEnabled(False)
+        control_layout1.addWidget(self.reverse_btn)
+        
         self.play_btn = QPushButton("▶ 播放")
         self.play_btn.clicked.connect(self.toggle_play)
         self.play_btn.setEnabled(False)
@@ -109,6 +203,25 @@ class VideoPlayer(QWidget):
         
         layout.addLayout(control_layout2)
         
+        # 候选关键帧跳转
+        suggestion_layout = QHBoxLayout()
+        
+        self.prev_marker_btn = QPushButton("◆ 上一候选")
+        self.prev_marker_btn.clicked.connect(lambda: self.jump_to_marker(-1))
+        self.prev_marker_btn.setEnabled(False)
+        suggestion_layout.addWidget(self.prev_marker_btn)
+        
+        self.suggestion_label = QLabel("")
+        self.suggestion_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        suggestion_layout.addWidget(self.suggestion_label, 1)
+        
+        self.next_marker_btn = QPushButton("下一候选 ◆")
+        self.next_marker_btn.clicked.connect(lambda: self.jump_to_marker(1))
+        self.next_marker_btn.setEnabled(False)
+        suggestion_layout.addWidget(self.next_marker_btn)
+        
+        layout.addLayout(suggestion_layout)
+        
         # 发送到标注区按钮
         self.send_btn = QPushButton("📤 发送当前帧到标注区 (Enter)")
         self.send_btn.clicked.connect(self.send_frame)
@@ -130,109 +243,361 @@ class VideoPlayer(QWidget):
         """)
         layout.addWidget(self.send_btn)
         
+        # 发送后找到附近更清晰的帧时显示
+        self.snap_btn = QPushButton()
+        self.snap_btn.clicked.connect(self.accept_snap)
+        self.snap_btn.setVisible(False)
+        layout.addWidget(self.snap_btn)
+        
         # 设置焦点策略以接收键盘事件
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         
     def setup_timer(self):
         """设置播放定时器"""
         self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.timer.timeout.connect(self.read_next_frame)
         
+    def setup_reader(self):
+        """启动后台解码线程"""
+        self.reader = VideoReaderThread(
+            self.frame_cache, self.display_cache,
+            prefetch_radius=self.prefetch_radius,
+            pool_size=self.decoder_pool_size
+        )
+        self.display_pipeline = self.reader.display_pipeline
+        self.update_display_size()
+        self.reader.video_opened.connect(self.on_video_opened)
+        self.reader.frame_ready.connect(self.on_frame_ready)
+        self.reader.preview_ready.connect(self.on_preview_ready)
+        self.reader.error_occurred.connect(self.on_reader_error)
+        self.reader.start()
+        
+    def setup_analyzer(self):
+        """启动候选关键帧分析线程"""
+        self.analyzer = VideoAnalysisThread()
+        self.analyzer.progress.connect(self.on_analysis_progress)
+        self.analyzer.analysis_finished.connect(self.on_analysis_finished)
+        self.analyzer.start()
+        
+    def setup_filmstrip(self):
+        """启动胶片条生成线程（使用独立的解码器，不影响播放）"""
+        self.filmstrip_thread = FilmstripThread()
+        self.filmstrip_thread.filmstrip_started.connect(self.on_filmstrip_ready)
+        self.filmstrip_thread.progress.connect(self.on_filmstrip_progress)
+        self.filmstrip_thread.filmstrip_finished.connect(self.on_filmstrip_ready)
+        self.filmstrip_thread.start()
+        
     def load_video(self, video_path):
         """加载视频文件"""
         self.stop()
-        
-        if self.cap is not None:
-            self.cap.release()
+        self.analyzer.cancel()
+        self.set_markers([])
+        self.clear_snap()
+        self.filmstrip_thread.cancel()
+        self.set_filmstrip(None)
+        
+        if self.video_path is not None:
+            self.resume_frames[self.video_path] = self.target_frame_number
             
-        self.cap = cv2.VideoCapture(video_path)
+        self.video_path = None
+        self.current_frame = None
+        self.display_label.setText("正在加载视频...")
+        self.reader.load_video(video_path, self.resume_frames.get(video_path, 0))
         
-        if not self.cap.isOpened():
-            self.display_label.setText("无法打开视频文件")
+    def on_video_opened(self, total_frames, fps, start_frame, seek_index, generation):
+        """视频打开后更新界面（之后又请求了其他视频时忽略，避免把旧视频的信息配给新路径）"""
+        if generation != self.reader.load_generation:
             return
-            
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
-        self.current_frame_number = 0
+        self.video_path = self.reader.video_path
+        self.total_frames = total_frames
+        self.fps = fps
+        # 没有索引时按平均帧率换算
+        self.seek_index = seek_index if seek_index is not None else SeekIndex(total_frames, fps)
+        self.current_frame_number = start_frame
+        self.target_frame_number = start_frame
+        self.dropped_frames = 0
+        self.late_frames = 0
+        self.step_requests = 0
+        self.prefetch_hits = 0
         
         # 更新UI
         self.progress_slider.setEnabled(True)
         self.progress_slider.setMaximum(self.total_frames - 1)
-        self.progress_slider.setValue(0)
+        self.progress_slider.blockSignals(True)
+        self.progress_slider.setValue(start_frame)
+        self.progress_slider.blockSignals(False)
         
         self.play_btn.setEnabled(True)
+        self.reverse_btn.setEnabled(True)
         self.prev_frame_btn.setEnabled(True)
         self.next_frame_btn.setEnabled(True)
         self.back_5s_btn.setEnabled(True)
         self.forward_5s_btn.setEnabled(True)
         self.send_btn.setEnabled(True)
         
-        # 读取第一帧
-        self.read_frame(0)
-        
-    def read_frame(self, frame_number):
-        """读取指定帧"""
-        if self.cap is None:
+        # 起始帧由解码线程随后送达；胶片条和候选关键帧在后台生成
+        self.filmstrip_thread.generate(self.video_path)
+        if self.suggested_frames > 0:
+            self.suggestion_label.setText("正在分析候选帧...")
+            self.analyzer.analyze(self.video_path)
+            
+    def on_filmstrip_ready(self, video_path, filmstrip):
+        """胶片条开始生成（部分可用）或生成完成"""
+        if video_path == self.video_path and filmstrip is not None:
+            self.set_filmstrip(filmstrip)
+            
+    def on_filmstrip_progress(self, video_path, done, total):
+        """胶片条有新缩略图"""
+        if video_path == self.video_path:
+            self.filmstrip_widget.refresh()
+            
+    def set_filmstrip(self, filmstrip):
+        """设置当前视频的胶片条"""
+        self.filmstrip = filmstrip
+        self.filmstrip_widget.set_filmstrip(filmstrip)
+        self.hide_hover_preview()
+        
+    def filmstrip_pixmap(self, frame_number):
+        """胶片条中最接近指定帧的缩略图，没有时返回None"""
+        if self.filmstrip is None:
+            return None
+        thumbnail = self.filmstrip.thumbnail(frame_number)
+        if thumbnail is None:
+            return None
+        return QPixmap.fromImage(FrameBuffer(thumbnail).to_qimage())
+        
+    def on_slider_hover(self, frame_number, x):
+        """鼠标悬停在进度条上时在其上方显示该位置的缩略图"""
+        pixmap = self.filmstrip_pixmap(frame_number)
+        if pixmap is None:
+            self.hide_hover_preview()
             return
             
-        frame_number = max(0, min(frame_number, self.total_frames - 1))
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        ret, frame = self.cap.read()
-        
-        if ret:
-            self.current_frame = frame
-            self.current_frame_number = frame_number
-            self.display_frame(frame)
-            self.update_frame_info()
+        self.hover_preview.setPixmap(pixmap)
+        self.hover_preview.adjustSize()
+        size = self.hover_preview.size()
+        anchor = self.progress_slider.mapTo(self, QPoint(x, 0))
+        left = min(max(0, anchor.x() - size.width() // 2), self.width() - size.width())
+        self.hover_preview.move(left, anchor.y() - size.height() - 4)
+        self.hover_preview.raise_()
+        self.hover_preview.show()
+        
+    def hide_hover_preview(self):
+        self.hover_preview.hide()
+        
+    def on_analysis_progress(self, video_path, done, total):
+        """候选关键帧分析进度"""
+        if video_path == self.video_path:
+            percent = min(100, done * 100 // total)
+            self.suggestion_label.setText(f"正在分析候选帧... {percent}%")
             
-    def read_next_frame(self):
-        """读取下一帧（播放时调用）"""
-        if self.cap is None:
+    def on_analysis_finished(self, video_path, scores):
+        """候选关键帧分析完成，在进度条上标出"""
+        if video_path != self.video_path:
             return
+        if scores is None:
+            self.suggestion_label.setText("候选帧分析失败")
+            return
+        self.set_markers(scores.top_frames(self.suggested_frames))
+        
+    def set_markers(self, frames):
+        """设置进度条上的候选关键帧"""
+        self.progress_slider.set_markers(frames)
+        self.prev_marker_btn.setEnabled(bool(frames))
+        self.next_marker_btn.setEnabled(bool(frames))
+        self.suggestion_label.setText(
+            f"候选帧: {len(frames)} 个 (Ctrl+←/→)" if frames else ""
+        )
+        
+    def jump_to_marker(self, direction):
+        """跳转到上一个/下一个候选关键帧"""
+        if direction > 0:
+            frame_number = self.progress_slider.next_marker(self.target_frame_number)
+        else:
+            frame_number = self.progress_slider.prev_marker(self.target_frame_number)
+        if frame_number is not None:
+            self.jump_to_frame(frame_number)
             
-        ret, frame = self.cap.read()
+    def jump_to_frame(self, frame_number):
+        """暂停并跳转到指定帧"""
+        self.stop()
+        self.read_frame(frame_number)
+        
+    def on_reader_error(self, message):
+        """解码线程报错"""
+        self.video_path = None
+        self.display_label.setText(message)
         
-        if ret:
-            self.current_frame = frame
-            self.current_frame_number = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-            self.display_frame(frame)
-            self.update_frame_info()
+    def read_frame(self, frame_number, backward=False):
+        """读取指定帧（请求解码线程，结果经 on_frame_ready 返回）
+
+        backward=True 表示向后逐帧，解码线程会缓冲整个GOP供后续后退使用。
+        """
+        if self.video_path is None:
+            return
             
-            # 更新进度条（不触发seek）
+        frame_number = max(0, min(frame_number, self.total_frames - 1))
+        self.target_frame_number = frame_number
+        
+        # 命中缓存时直接显示，无需解码
+        frame = self.frame_cache.get(self.video_path, frame_number)
+        self.step_requests += 1
+        if frame is not None:
+            if frame_number in self.reader.prefetched_frames:
+                self.prefetch_hits += 1
+            key = self.display_pipeline.cache_key(self.video_path)
+            display = self.display_cache.get(key, frame_number)
+            if display is None:
+                display = self.display_pipeline.process(frame, smooth=True)
+            self.on_frame_ready(frame, display, frame_number)
+            self.reader.prefetch_around(frame_number)
+            return
+            
+        if backward:
+            self.reader.step_back(frame_number)
+        else:
+            self.reader.seek(frame_number)
+            
+    def on_frame_ready(self, frame, display, frame_number):
+        """解码线程返回单帧"""
+        if self.video_path is None:
+            return  # 正在加载其他视频，这是之前视频的帧
+        if frame_number != self.target_frame_number:
+            return  # 已被更新的请求取代
+            
+        self.show_frame(frame, display, frame_number)
+        
+        # 跳转后以新位置重置播放时钟
+        self.reset_play_clock()
+        
+    def show_frame(self, frame, display, frame_number):
+        """显示一帧并同步进度信息
+
+        frame 为全分辨率原始帧（仅供发送到标注区），display 为已缩放的显示帧。
+        """
+        self.current_frame = frame
+        self.current_frame_number = frame_number
+        self.target_frame_number = frame_number
+        self.display_image(display)
+        self.update_frame_info()
+        
+        # 更新进度条（不触发seek，拖动中不打断用户）
+        if not self.progress_slider.isSliderDown():
             self.progress_slider.blockSignals(True)
             self.progress_slider.setValue(self.current_frame_number)
             self.progress_slider.blockSignals(False)
-        else:
-            # 视频结束
-            self.stop()
             
-    def display_frame(self, frame):
-        """在标签上显示帧"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        
-        q_image = QImage(
-            rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888
+    def read_next_frame(self):
+        """从播放队列取帧（播放时由定时器调用）"""
+        if self.video_path is None:
+            return
+            
+        # 按播放时钟和帧时间戳计算此刻应显示的帧
+        elapsed = time.monotonic() - self.play_start_time
+        expected = self.seek_index.frame_at_time(
+            self.seek_index.time_of_frame(self.play_start_frame)
+            + elapsed * 1000 * self.playback_speed * self.play_direction
         )
         
-        pixmap = QPixmap.fromImage(q_image)
-        scaled_pixmap = pixmap.scaled(
-            self.display_label.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
+        latest = None
+        while True:
+            try:
+                generation, frame_number, frame, display = self.reader.frame_queue.get_nowait()
+            except queue.Empty:
+                break
+                
+            if generation != self.reader.generation:
+                continue  # 跳转前解码的过期帧
+                
+            if frame is None:
+                # 视频结束
+                if latest is not None:
+                    self.show_frame(latest[1], latest[2], latest[0])
+                self.stop()
+                return
+                
+            if latest is not None:
+                self.dropped_frames += 1
+            latest = (frame_number, frame, display)
+            
+            if (frame_number - expected) * self.play_direction >= 0:
+                break
+                
+        if latest is None or (latest[0] - expected) * self.play_direction < 0:
+            self.late_frames += 1
+        if latest is not None:
+            self.show_frame(latest[1], latest[2], latest[0])
+            
+    def reset_play_clock(self):
+        """以当前帧为起点重置播放时钟"""
+        self.play_start_time = time.monotonic()
+        self.play_start_frame = self.current_frame_number
+        
+    def get_playback_stats(self):
+        """获取播放统计"""
+        return {
+            "dropped_frames": self.dropped_frames,
+            "late_frames": self.late_frames,
+            "queued_frames": self.reader.frame_queue.qsize(),
+            "frame_cache": self.frame_cache.get_stats(),
+            "decoder_pool": {
+                "open": len(self.reader.decoder_pool),
+                "hits": self.reader.decoder_pool.hits,
+                "misses": self.reader.decoder_pool.misses
+            },
+            "seeks": {
+                "skipped": self.reader.skipped_commands,
+                "cancelled": self.reader.cancelled_decodes
+            },
+            "prefetch": {
+                "requests": self.step_requests,
+                "hits": self.prefetch_hits,
+                "hit_rate": (self.prefetch_hits / self.step_requests
+                             if self.step_requests else 0.0)
+            }
+        }
+        
+    def playback_stats_text(self):
+        """播放统计的一行摘要（状态栏显示用）"""
+        stats = self.get_playback_stats()
+        cache = stats["frame_cache"]
+        pool = stats["decoder_pool"]
+        return (
+            f"帧缓存命中 {cache['hit_rate']:.0%} ({cache['used_mb']:.0f}/{cache['budget_mb']:.0f}MB)  |  "
+            f"预取命中 {stats['prefetch']['hit_rate']:.0%} ({stats['prefetch']['requests']})  |  "
+            f"解码器池 {pool['open']} 个, 命中 {pool['hits']}/{pool['hits'] + pool['misses']}  |  "
+            f"跳转丢弃 {stats['seeks']['skipped']} 中止 {stats['seeks']['cancelled']}  |  "
+            f"丢帧 {stats['dropped_frames']} 延迟 {stats['late_frames']} 队列 {stats['queued_frames']}"
         )
-        self.display_label.setPixmap(scaled_pixmap)
-        
-    def update_frame_info(self):
-        """更新帧信息显示"""
-        time_current = self.current_frame_number / self.fps
-        time_total = self.total_frames / self.fps
         
-        self.frame_info_label.setText(
-            f"帧: {self.current_frame_number + 1} / {self.total_frames}  |  "
+    def display_frame(self, frame):
+        """在标签上显示全分辨率帧（缩放后显示，仅用于暂停和窗口变化时重绘）"""
+        self.display_image(self.display_pipeline.process(frame, smooth=True))
+        
+    def display_image(self, display):
+        """在标签上显示已缩放到显示尺寸的帧（BGR888视图，无颜色转换）"""
+        self.display_label.setPixmap(QPixmap.fromImage(display.to_qimage()))
+        
+    def update_display_size(self):
+        """同步显示区域大小到显示管线"""
+        size = self.display_label.size()
+        self.display_pipeline.set_target_size(size.width(), size.height())
+        
+    def update_frame_info(self, frame_number=None):
+        """更新帧信息显示（拖动预览时显示预览位置的帧号）"""
+        if frame_number is None:
+            frame_number = self.current_frame_number
+        time_current = self.frame_time(frame_number) / 1000
+        time_total = self.seek_index.duration() / 1000
+        
+        info = (
+            f"帧: {frame_number + 1} / {self.total_frames}  |  "
             f"时间: {time_current:.1f}s / {time_total:.1f}s"
         )
+        if self.dropped_frames or self.late_frames:
+            info += f"  |  丢帧: {self.dropped_frames} 延迟: {self.late_frames}"
+        self.frame_info_label.setText(info)
         
     def toggle_play(self):
         """切换播放/暂停"""
@@ -241,13 +606,26 @@ class VideoPlayer(QWidget):
         else:
             self.play()
             
-    def play(self):
-        """开始播放"""
-        if self.cap is None:
+    def toggle_reverse_play(self):
+        """切换倒放/暂停"""
+        if self.is_playing and self.play_direction < 0:
+            self.stop()
+        else:
+            self.play(direction=-1)
+            
+    def play(self, direction=1):
+        """开始播放，direction=-1 时倒放"""
+        if self.video_path is None:
             return
             
         self.is_playing = True
-        self.play_btn.setText("⏸ 暂停")
+        self.play_direction = direction
+        self.play_btn.setText("⏸ 暂停" if direction > 0 else "▶ 播放")
+        self.reverse_btn.setText("⏸ 暂停" if direction < 0 else "◀ 倒放")
+        
+        self.reset_play_clock()
+        self.reader.set_speed(self.playback_speed)
+        self.reader.play(self.target_frame_number, direction)
         
         # 根据播放速度计算定时器间隔
         interval = int(1000 / (self.fps * self.playback_speed))
@@ -255,65 +633,216 @@ class VideoPlayer(QWidget):
         
     def stop(self):
         """停止播放"""
+        was_playing = self.is_playing
         self.is_playing = False
         self.play_btn.setText("▶ 播放")
+        self.reverse_btn.setText("◀ 倒放")
         self.timer.stop()
         
+        # 从播放转为暂停时，空闲预取当前帧前后的帧
+        self.reader.pause(self.target_frame_number if was_playing else None)
+        
+        # 播放时使用快速缩放，暂停后以平滑缩放重绘当前帧
+        if was_playing and self.current_frame is not None:
+            self.display_frame(self.current_frame)
+            
+    def shutdown(self):
+        """关闭解码线程和分析线程"""
+        self.stop()
+        self.reader.stop()
+        self.analyzer.stop()
+        self.filmstrip_thread.stop()
+        self.snap_executor.shutdown(wait=True, cancel_futures=True)
+        
     def prev_frame(self):
         """上一帧"""
         self.stop()
-        self.read_frame(self.current_frame_number - 1)
-        self.progress_slider.setValue(self.current_frame_number)
+        self.read_frame(self.target_frame_number - 1, backward=True)
         
     def next_frame(self):
         """下一帧"""
         self.stop()
-        self.read_frame(self.current_frame_number + 1)
-        self.progress_slider.setValue(self.current_frame_number)
+        self.read_frame(self.target_frame_number + 1)
+        
+    def frame_time(self, frame_number):
+        """帧的显示时间戳(ms)"""
+        return self.seek_index.time_of_frame(frame_number)
         
     def skip_seconds(self, seconds):
-        """跳过指定秒数"""
+        """按显示时间跳过指定秒数（可变帧率视频中不按平均帧率换算帧数）"""
         self.stop()
-        frames_to_skip = int(seconds * self.fps)
-        new_frame = self.current_frame_number + frames_to_skip
-        self.read_frame(new_frame)
-        self.progress_slider.setValue(self.current_frame_number)
+        target_time = self.frame_time(self.target_frame_number) + seconds * 1000
+        self.read_frame(self.seek_index.frame_at_time(target_time))
         
     def seek_frame(self, value):
-        """跳转到指定帧"""
-        self.read_frame(value)
-        
+        """拖动进度条: 先显示胶片条缩略图，再请求关键帧预览，松开后才解码目标帧；
+        不是拖动（点击滑槽、键盘）时直接跳转"""
+        if not self.progress_slider.isSliderDown():
+            self.read_frame(value)
+            return
+        if self.video_path is None:
+            return
+            
+        self.scrub_preview = True
+        self.target_frame_number = value
+        pixmap = self.filmstrip_pixmap(value)
+        if pixmap is not None:
+            self.display_label.setPixmap(pixmap.scaled(
+                self.display_label.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation
+            ))
+        self.update_frame_info(value)
+        self.request_preview(value)
+        
+    def request_preview(self, frame_number):
+        """请求关键帧预览；上一个请求尚未返回时只记住最新位置，返回后再发送"""
+        if self.preview_busy:
+            self.pending_preview = frame_number
+            return
+        self.preview_busy = True
+        self.pending_preview = None
+        self.reader.preview(frame_number)
+        
+    def on_preview_ready(self, display, keyframe_number, frame_number):
+        """关键帧预览返回"""
+        self.preview_busy = False
+        if not self.scrub_preview:
+            return  # 已松开，目标帧正在解码
+            
+        # 位置已变化时不回退显示旧的预览（除非没有胶片条缩略图可看）
+        if display is not None and (frame_number == self.target_frame_number or self.filmstrip is None):
+            self.display_image(display)
+        if self.pending_preview is not None:
+            self.request_preview(self.pending_preview)
+            
     def on_slider_pressed(self):
         """进度条按下时暂停播放"""
         if self.is_playing:
             self.timer.stop()
+            self.reader.pause()
             
     def on_slider_released(self):
-        """进度条释放时恢复播放"""
+        """进度条释放时解码目标帧（拖动时只显示了预览），并恢复播放"""
+        if self.scrub_preview:
+            self.scrub_preview = False
+            self.preview_busy = False
+            self.pending_preview = None
+            self.read_frame(self.progress_slider.value())
+            
         if self.is_playing:
+            self.reset_play_clock()
+            self.reader.play(self.target_frame_number, self.play_direction)
             interval = int(1000 / (self.fps * self.playback_speed))
             self.timer.start(interval)
             
     def change_speed(self, speed_text):
         """改变播放速度"""
         self.playback_speed = float(speed_text.replace('x', ''))
+        self.reader.set_speed(self.playback_speed)
         
         if self.is_playing:
+            self.reset_play_clock()
             interval = int(1000 / (self.fps * self.playback_speed))
             self.timer.setInterval(interval)
             
     def send_frame(self):
         """发送当前帧到标注区"""
-        if self.current_frame is not None:
-            self.frame_sent.emit(self.current_frame.copy(), self.current_frame_number)
+        if self.video_path is None:
+            return
+            
+        frame = self.frame_cache.get(self.video_path, self.current_frame_number)
+        if frame is None:
+            frame = self.current_frame
+        if frame is not None:
+            # 只读共享，标注区需要修改时自行复制
+            self.frame_sent.emit(frame, self.current_frame_number)
+            self.request_snap(self.current_frame_number, frame)
+            
+    def request_snap(self, frame_number, frame):
+        """在后台比较刚发送的帧与前后已缓存帧的清晰度"""
+        self.clear_snap()
+        if self.snap_mode == "off" or self.snap_radius <= 0:
+            return
             
+        candidates = []
+        start = max(0, frame_number - self.snap_radius)
+        end = min(self.total_frames - 1, frame_number + self.snap_radius)
+        for n in range(start, end + 1):
+            candidate = frame if n == frame_number else self.frame_cache.get(
+                self.video_path, n, count=False
+            )
+            if candidate is not None:
+                candidates.append((n, candidate))
+        if len(candidates) > 1:
+            self.snap_executor.submit(
+                self.find_sharpest, self.snap_generation, frame_number, candidates
+            )
+            
+    def find_sharpest(self, generation, frame_number, candidates):
+        """工作线程: 找出明显比发送帧更清晰的附近帧"""
+        try:
+            scores = frame_sharpness([frame for _, frame in candidates])
+        except Exception as e:
+            print(f"计算清晰度失败: {e}")
+            return
+            
+        sent = [n for n, _ in candidates].index(frame_number)
+        best = max(range(len(candidates)), key=lambda i: scores[i])
+        if best == sent or scores[best] <= scores[sent] * (1 + self.SNAP_MIN_GAIN):
+            return
+            
+        gain = scores[best] / scores[sent] - 1 if scores[sent] > 0 else 1.0
+        try:
+            self.sharper_frame_found.emit(generation, *candidates[best], float(gain))
+        except RuntimeError:
+            # 播放器已销毁
+            pass
+            
+    def on_sharper_frame_found(self, generation, frame_number, frame, gain):
+        """找到更清晰的附近帧: 按设置自动替换或提示用户"""
+        if generation != self.snap_generation:
+            return  # 之后又发送过其他帧
+            
+        self.snap_candidate = (frame_number, frame)
+        if self.snap_mode == "auto":
+            self.accept_snap()
+            self.snap_btn.setText(f"✓ 已自动改用更清晰的第 {frame_number} 帧 (+{gain:.0%})")
+            self.snap_btn.setEnabled(False)
+        else:
+            self.snap_btn.setText(f"✨ 第 {frame_number} 帧更清晰 (+{gain:.0%})，改用此帧 (Ctrl+Enter)")
+            self.snap_btn.setEnabled(True)
+        self.snap_btn.setVisible(True)
+        
+    def accept_snap(self):
+        """改用找到的更清晰帧: 替换标注区的帧并跳转到该帧"""
+        if self.snap_candidate is None:
+            return
+        frame_number, frame = self.snap_candidate
+        self.snap_candidate = None
+        self.snap_btn.setVisible(False)
+        self.frame_replaced.emit(frame, frame_number)
+        self.jump_to_frame(frame_number)
+        
+    def clear_snap(self):
+        """放弃尚未采用的清晰帧提示"""
+        self.snap_generation += 1
+        self.snap_candidate = None
+        self.snap_btn.setVisible(False)
+        
     def keyPressEvent(self, event: QKeyEvent):
         """处理键盘事件"""
         key = event.key()
         modifiers = event.modifiers()
         
         if key == Qt.Key.Key_Space:
-            self.toggle_play()
+            if modifiers & Qt.KeyboardModifier.ShiftModifier:
+                self.toggle_reverse_play()
+            else:
+                self.toggle_play()
+        elif key == Qt.Key.Key_Left and modifiers & Qt.KeyboardModifier.ControlModifier:
+            self.jump_to_marker(-1)
+        elif key == Qt.Key.Key_Right and modifiers & Qt.KeyboardModifier.ControlModifier:
+            self.jump_to_marker(1)
         elif key == Qt.Key.Key_Left:
             self.prev_frame()
         elif key == Qt.Key.Key_Right:
@@ -322,6 +851,8 @@ class VideoPlayer(QWidget):
             self.skip_seconds(5)
         elif key == Qt.Key.Key_Down:
             self.skip_seconds(-5)
+        elif key in (Qt.Key.Key_Return, Qt.Key.Key_Enter) and modifiers & Qt.KeyboardModifier.ControlModifier:
+            self.accept_snap()
         elif key == Qt.Key.Key_Return or key == Qt.Key.Key_Enter:
             self.send_frame()
         else:
@@ -330,5 +861,6 @@ class VideoPlayer(QWidget):
     def resizeEvent(self, event):
         """窗口大小改变时重新显示帧"""
         super().resizeEvent(event)
+        self.update_display_size()
         if self.current_frame is not None:
             self.display_frame(self.current_frame)
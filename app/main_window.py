@@ -6,15 +6,20 @@ from PyQt6.QtWidgets import (
     QSplitter, QStatusBar, QMenuBar, QMenu, QMessageBox,
     QDialog, QLabel, QLineEdit, QPushButton, QColorDialog,
     QListWidget, QListWidgetItem, QGridLayout, QScrollArea,
-    QFileDialog
+    QFileDialog, QProgressDialog, QApplication, QListView, QCheckBox
 )
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction, QKeySequence, QColor, QPixmap
 
 from app.components.video_list_widget import VideoListWidget
 from app.components.video_player import VideoPlayer
 from app.components.annotation_widget import AnnotationWidget
+from app.components.thumbnail_model import ThumbnailListModel
+from app.threads.save_thread import AnnotationSaveThread
 from app.utils.file_utils import ConfigManager, AnnotationManager
+from app.utils.annotation_store import video_key
+from app.utils.frame_buffer import FrameBuffer
+from app.utils.reference_renderer import ReferenceRenderer
 
 import os
 
@@ -112,14 +117,32 @@ class LabelManagerDialog(QDialog):
 
 
 class ReviewDialog(QDialog):
-    """审阅模式对话框"""
+    """审阅模式对话框
+
+    列表来自标注管理器的内存索引，并监听其变更：
+    后台保存完成、删除或日志被外部修改后自动更新，无需重新打开。
+    指定了当前视频时可以只看该视频的标注（按来源视频索引查找）。
+    """
+    
+    # 标注变更（可能来自保存线程）: 操作, 图像ID, 元数据
+    annotation_changed = pyqtSignal(str, object, object)
     
-    def __init__(self, annotation_manager, parent=None):
+    def __init__(self, annotation_manager, source_video=None, parent=None):
         super().__init__(parent)
         self.annotation_manager = annotation_manager
+        self.source_video = source_video
+        self.renderer = ReferenceRenderer(annotation_manager)
+        self.thumbnail_model = ThumbnailListModel(annotation_manager, size=150, parent=self)
+        self.finished.connect(self.thumbnail_model.shutdown)
         self.setup_ui()
         self.load_images()
         
+        self.annotation_changed.connect(self.on_annotation_changed)
+        self.annotation_manager.add_listener(self.notify_annotation_changed)
+        self.finished.connect(
+            lambda: self.annotation_manager.remove_listener(self.notify_annotation_changed)
+        )
+        
     def setup_ui(self):
         self.setWindowTitle("审阅标注结果")
         self.setMinimumSize(900, 600)
@@ -130,10 +153,18 @@ class ReviewDialog(QDialog):
         left_panel = QWidget()
         left_layout = QVBoxLayout(left_panel)
         
-        self.thumbnail_list = QListWidget()
+        self.current_video_check = QCheckBox(f"只看当前视频 ({self.source_video})")
+        self.current_video_check.setVisible(self.source_video is not None)
+        self.current_video_check.toggled.connect(lambda: self.load_images())
+        left_layout.addWidget(self.current_video_check)
+        
+        # 缩略图只为可见行在后台加载
+        self.thumbnail_list = QListView()
+        self.thumbnail_list.setModel(self.thumbnail_model)
         self.thumbnail_list.setIconSize(QSize(150, 150))
         self.thumbnail_list.setSpacing(5)
-        self.thumbnail_list.currentItemChanged.connect(self.on_selection_changed)
+        self.thumbnail_list.setUniformItemSizes(True)
+        self.thumbnail_list.selectionModel().currentChanged.connect(self.on_selection_changed)
         left_layout.addWidget(self.thumbnail_list)
         
         self.delete_btn = QPushButton("删除选中标注")
@@ -159,25 +190,72 @@ class ReviewDialog(QDialog):
         layout.addWidget(right_panel, 2)
         
     def load_images(self):
-        reference_dir = "saved_images/Reference"
-        if not os.path.exists(reference_dir):
+        # 从标注索引列出标注；参考图可能是文件，也可能按标记点现场绘制
+        # 这里只列出文件名，缩略图由模型按需加载
+        if self.video_filter() is not None:
+            annotations = self.annotation_manager.find_annotations(self.source_video)
+        else:
+            annotations = self.annotation_manager.load_annotations()
+            
+        items = []
+        for image_id, data in sorted(annotations.items()):
+            filename = self.annotation_filename(image_id, data)
+            if filename:
+                items.append((image_id, filename))
+        self.thumbnail_model.set_items(items)
+        
+    def video_filter(self):
+        """只看当前视频时返回该视频，否则返回None"""
+        if self.source_video is not None and self.current_video_check.isChecked():
+            return self.source_video
+        return None
+        
+    def annotation_filename(self, image_id, data):
+        """标注对应的Annotation图像文件名（旧数据没有记录时查找文件）"""
+        filename = data.get("annotation_file")
+        if filename:
+            return filename
+        path = self.annotation_manager.find_image(AnnotationManager.ANNOTATION_DIR, image_id)
+        return os.path.basename(path) if path else None
+        
+    def notify_annotation_changed(self, op, image_id, data):
+        """标注管理器的监听回调，转发到界面线程"""
+        self.annotation_changed.emit(op, image_id, data)
+        
+    def on_annotation_changed(self, op, image_id, data):
+        """标注索引变更时更新列表"""
+        if op == "reload":
+            self.load_images()
             return
             
-        for filename in sorted(os.listdir(reference_dir)):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                filepath = os.path.join(reference_dir, filename)
-                pixmap = QPixmap(filepath)
-                if not pixmap.isNull():
-                    item = QListWidgetItem()
-                    item.setIcon(pixmap.scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
-                    item.setText(filename)
-                    item.setData(Qt.ItemDataRole.UserRole, filepath)
-                    self.thumbnail_list.addItem(item)
-                    
+        if op == "delete":
+            self.thumbnail_model.remove_image(image_id)
+            return
+            
+        video = self.video_filter()
+        if video is not None and video_key(data.get("source_video")) != video_key(video):
+            return
+            
+        filename = self.annotation_filename(image_id, data)
+        if filename:
+            self.thumbnail_model.add_image(image_id, filename)
+            
+        # 当前预览的标注被覆盖时刷新预览
+        current = self.thumbnail_list.currentIndex()
+        if current.isValid() and current.data(ThumbnailListModel.IMAGE_ID_ROLE) == image_id:
+            self.on_selection_changed(current, current)
+            
+    def reference_pixmap(self, image_id):
+        """获取参考图的QPixmap（无法生成时为空）"""
+        image = self.renderer.render(image_id)
+        if image is None:
+            return QPixmap()
+        return QPixmap.fromImage(FrameBuffer(image).to_qimage())
+        
     def on_selection_changed(self, current, previous):
-        if current:
-            filepath = current.data(Qt.ItemDataRole.UserRole)
-            pixmap = QPixmap(filepath)
+        if current.isValid():
+            base_name = current.data(ThumbnailListModel.IMAGE_ID_ROLE)
+            pixmap = self.reference_pixmap(base_name)
             scaled = pixmap.scaled(
                 self.preview_label.size(),
                 Qt.AspectRatioMode.KeepAspectRatio,
@@ -186,13 +264,11 @@ class ReviewDialog(QDialog):
             self.preview_label.setPixmap(scaled)
             
             # 显示元数据
-            filename = os.path.basename(filepath)
-            base_name = os.path.splitext(filename)[0]
-            annotations = self.annotation_manager.load_annotations()
+            filename = current.data(Qt.ItemDataRole.DisplayRole)
+            data = self.annotation_manager.get_annotation(base_name)
             
             info_text = f"文件名: {filename}\n"
-            if base_name in annotations:
-                data = annotations[base_name]
+            if data is not None:
                 info_text += f"来源视频: {data.get('source_video', 'N/A')}\n"
                 info_text += f"帧号: {data.get('frame_number', 'N/A')}\n"
                 info_text += f"注释: {data.get('comment', '无')}\n"
@@ -200,8 +276,8 @@ class ReviewDialog(QDialog):
             self.info_label.setText(info_text)
             
     def delete_selected(self):
-        current = self.thumbnail_list.currentItem()
-        if not current:
+        current = self.thumbnail_list.currentIndex()
+        if not current.isValid():
             return
             
         reply = QMessageBox.question(
@@ -211,26 +287,17 @@ class ReviewDialog(QDialog):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            filepath = current.data(Qt.ItemDataRole.UserRole)
-            filename = os.path.basename(filepath)
-            base_name = os.path.splitext(filename)[0]
+            base_name = current.data(ThumbnailListModel.IMAGE_ID_ROLE)
             
-            # 删除文件
-            ref_path = filepath
-            ann_path = os.path.join("saved_images/Annotation", filename)
-            
-            if os.path.exists(ref_path):
-                os.remove(ref_path)
-            if os.path.exists(ann_path):
-                os.remove(ann_path)
-                
-            # 从元数据中删除
+            # 删除文件（两个目录的格式可能不同，overlay模式下没有参考图文件）
+            for output_dir in (AnnotationManager.ANNOTATION_DIR, AnnotationManager.REFERENCE_DIR):
+                path = self.annotation_manager.find_image(output_dir, base_name)
+                if path:
+                    os.remove(path)
+                    
+            # 从元数据中删除（列表通过变更通知移除该行）
             self.annotation_manager.delete_annotation(base_name)
             
-            # 从列表中移除
-            row = self.thumbnail_list.row(current)
-            self.thumbnail_list.takeItem(row)
-            
             self.preview_label.clear()
             self.preview_label.setText("选择一张图片进行预览")
             self.info_label.clear()
@@ -239,12 +306,21 @@ class ReviewDialog(QDialog):
 class MainWindow(QMainWindow):
     """主窗口类"""
     
+    # 播放统计的刷新间隔(ms)
+    STATS_INTERVAL = 1000
+    
     def __init__(self):
         super().__init__()
         
         # 初始化配置和标注管理器
         self.config_manager = ConfigManager()
-        self.annotation_manager = AnnotationManager()
+        self.annotation_manager = AnnotationManager(self.config_manager)
+        self.current_video_path = None
+        
+        # 后台保存线程（视频列表的标注进度由标注存储的变更通知更新）
+        self.save_thread = AnnotationSaveThread(self.annotation_manager)
+        self.save_thread.save_finished.connect(self.on_save_finished)
+        self.save_thread.start()
         
         self.setup_ui()
         self.setup_menu()
@@ -268,11 +344,11 @@ class MainWindow(QMainWindow):
         splitter = QSplitter(Qt.Orientation.Horizontal)
         
         # 左栏：视频列表
-        self.video_list = VideoListWidget()
+        self.video_list = VideoListWidget(self.annotation_manager)
         splitter.addWidget(self.video_list)
         
         # 中栏：视频播放器
-        self.video_player = VideoPlayer()
+        self.video_player = VideoPlayer(self.config_manager)
         splitter.addWidget(self.video_player)
         
         # 右栏：标注区域
@@ -289,6 +365,14 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("就绪 - 请从左侧选择视频文件")
         
+        # 播放统计（缓存、预取、解码器池、跳转），从工具菜单打开
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet("color: #666;")
+        self.stats_label.setVisible(False)
+        self.status_bar.addPermanentWidget(self.stats_label)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_playback_stats)
+        
     def setup_menu(self):
         menubar = self.menuBar()
         
@@ -316,6 +400,17 @@ class MainWindow(QMainWindow):
         review_action.triggered.connect(self.open_review_dialog)
         tools_menu.addAction(review_action)
         
+        export_action = QAction("导出参考图(&E)", self)
+        export_action.triggered.connect(self.export_references)
+        tools_menu.addAction(export_action)
+        
+        tools_menu.addSeparator()
+        
+        stats_action = QAction("显示播放统计(&S)", self)
+        stats_action.setCheckable(True)
+        stats_action.toggled.connect(self.toggle_playback_stats)
+        tools_menu.addAction(stats_action)
+        
         # 帮助菜单
         help_menu = menubar.addMenu("帮助(&H)")
         
@@ -339,6 +434,7 @@ class MainWindow(QMainWindow):
         
         # 视频播放器发送帧 -> 标注区域
         self.video_player.frame_sent.connect(self.on_frame_sent)
+        self.video_player.frame_replaced.connect(self.on_frame_replaced)
         
         # 标注保存信号
         self.annotation_widget.save_requested.connect(self.on_save_requested)
@@ -373,11 +469,47 @@ class MainWindow(QMainWindow):
             self.annotation_widget.update_labels(new_labels)
             self.status_bar.showMessage("标签类别已更新")
             
+    def toggle_playback_stats(self, visible):
+        """在状态栏显示或隐藏播放统计"""
+        self.stats_label.setVisible(visible)
+        if visible:
+            self.update_playback_stats()
+            self.stats_timer.start(self.STATS_INTERVAL)
+        else:
+            self.stats_timer.stop()
+            
+    def update_playback_stats(self):
+        """刷新状态栏中的播放统计"""
+        self.stats_label.setText(self.video_player.playback_stats_text())
+        
     def open_review_dialog(self):
         """打开审阅对话框"""
-        dialog = ReviewDialog(self.annotation_manager, self)
+        source_video = None
+        if self.current_video_path:
+            source_video = os.path.splitext(os.path.basename(self.current_video_path))[0]
+        dialog = ReviewDialog(self.annotation_manager, source_video, self)
         dialog.exec()
         
+    def export_references(self):
+        """把所有标注的参考图（按标记点绘制）导出到选择的文件夹"""
+        folder = QFileDialog.getExistingDirectory(self, "选择导出文件夹", "./saved_images")
+        if not folder:
+            return
+            
+        progress_dialog = QProgressDialog("正在导出参考图...", "取消", 0, 0, self)
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        
+        def on_progress(done, total):
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+            QApplication.processEvents()
+            return not progress_dialog.wasCanceled()
+            
+        renderer = ReferenceRenderer(self.annotation_manager)
+        count = renderer.export(folder, on_progress)
+        progress_dialog.close()
+        self.status_bar.showMessage(f"已导出 {count} 张参考图到: {folder}")
+        
     def show_shortcuts_help(self):
         """显示快捷键帮助"""
         help_text = """
@@ -385,6 +517,7 @@ class MainWindow(QMainWindow):
         
         【视频控制】
         空格键        播放/暂停
+        Shift+空格    倒放/暂停
         左方向键(←)   后退一帧
         右方向键(→)   前进一帧
         上方向键(↑)   快进5秒
@@ -420,16 +553,23 @@ class MainWindow(QMainWindow):
     def on_frame_sent(self, frame, frame_number):
         """处理帧发送到标注区"""
         video_name = os.path.splitext(os.path.basename(self.current_video_path))[0]
-        self.annotation_widget.set_frame(frame, video_name, frame_number)
+        self.annotation_widget.set_frame(
+            frame, video_name, frame_number, self.video_player.frame_time(frame_number)
+        )
         self.status_bar.showMessage(f"已发送第 {frame_number} 帧到标注区")
         
+    def on_frame_replaced(self, frame, frame_number):
+        """用附近更清晰的帧替换标注区的帧（保留已画的ROI和标记点）"""
+        self.annotation_widget.replace_frame(frame, frame_number, self.video_player.frame_time(frame_number))
+        self.status_bar.showMessage(f"已改用更清晰的第 {frame_number} 帧")
+        
     def on_save_requested(self, data):
         """处理保存请求"""
         image_id = data['image_id']
         
-        # 检查是否已存在
-        ann_path = f"saved_images/Annotation/{image_id}.png"
-        if os.path.exists(ann_path):
+        # 检查该视频的这一帧是否已有标注（按来源视频和帧号索引查找，包括还在后台保存的）
+        exists = bool(self.annotation_manager.find_annotations(data['source_video'], data['frame_number']))
+        if exists or self.save_thread.is_pending(image_id):
             reply = QMessageBox.question(
                 self, "文件已存在",
                 f"{image_id} 的标注已存在，是否覆盖？",
@@ -438,17 +578,36 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.StandardButton.No:
                 return
                 
-        # 保存图片和元数据
-        success = self.annotation_manager.save_annotation(data)
+        # 交给后台线程保存图片和元数据，界面可以立即继续操作；队列已满时不等待，请用户稍后再保存
+        if not self.save_thread.submit(data):
+            message = f"保存队列已满（{self.save_thread.pending_count()} 项等待中），请稍后再保存 {image_id}"
+            self.status_bar.showMessage(message)
+            self.annotation_widget.show_message(message, "warning")
+            return
+        self.status_bar.showMessage(
+            f"正在保存: {image_id}（队列中 {self.save_thread.pending_count()} 项）"
+        )
         
+    def on_save_finished(self, image_id, success, times):
+        """处理后台保存结果"""
         if success:
-            self.status_bar.showMessage(f"已保存: {image_id}")
-            self.video_list.mark_as_processed(self.current_video_path)
+            self.status_bar.showMessage(
+                f"已保存: {image_id}（Annotation {times['annotation_ms']:.0f}ms / "
+                f"Reference {times['reference_ms']:.0f}ms，共 {times['total_ms']:.0f}ms）"
+            )
         else:
-            QMessageBox.warning(self, "保存失败", "保存标注时发生错误")
+            self.status_bar.showMessage(f"保存失败: {image_id}")
+            QMessageBox.warning(self, "保存失败", f"保存标注 {image_id} 时发生错误")
             
     def closeEvent(self, event):
         """窗口关闭事件"""
         self.config_manager.save_config()
-        self.video_player.stop()
+        self.stats_timer.stop()
+        self.video_player.shutdown()
+        self.video_list.shutdown()
+        
+        # 等待后台保存全部完成
+        if self.save_thread.pending_count():
+            self.status_bar.showMessage("正在完成剩余的保存...")
+        self.save_thread.stop()
         event.accept()
@@ -2,3 +2,7 @@
 线程模块
 """
 from .video_thread import VideoReaderThread
+from .save_thread import AnnotationSaveThread
+from .analysis_thread import VideoAnalysisThread
+from .filmstrip_thread import FilmstripThread
+from .library_thread import LibraryScanThread
@@ -0,0 +1,64 @@
+"""
+视频分析线程 - 在后台计算逐帧评分，推荐候选关键帧
+"""
+from PyQt6.QtCore import QThread, pyqtSignal
+from app.utils.frame_scores import FrameScores
+
+import queue
+
+
+class VideoAnalysisThread(QThread):
+    """视频分析线程
+
+    只分析最近一次请求的视频：切换视频后，正在进行的分析在当前块结束时放弃。
+    结果缓存在旁路文件中，再次打开同一视频时直接读取。
+    """
+    
+    progress = pyqtSignal(str, int, int)            # 视频路径, 已分析帧数, 总帧数
+    analysis_finished = pyqtSignal(str, object)     # 视频路径, FrameScores（失败或取消时为None）
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        
+        self.requests = queue.Queue()
+        self.latest_path = None     # 最近一次请求的视频，与之不同的分析会被放弃
+        
+    def analyze(self, video_path):
+        """请求分析视频"""
+        self.latest_path = video_path
+        self.requests.put(video_path)
+        
+    def cancel(self):
+        """放弃当前的分析"""
+        self.latest_path = None
+        
+    def run(self):
+        """线程主循环，收到 None 时结束"""
+        self.setPriority(QThread.Priority.LowPriority)
+        
+        while True:
+            video_path = self.requests.get()
+            if video_path is None:
+                break
+            if video_path != self.latest_path:
+                continue
+                
+            try:
+                scores = FrameScores.load_or_compute(
+                    video_path,
+                    progress=lambda done, total: self.progress.emit(video_path, done, total),
+                    is_cancelled=lambda: self.latest_path != video_path
+                )
+            except Exception as e:
+                print(f"分析视频失败: {e}")
+                scores = None
+                
+            if video_path == self.latest_path:
+                self.analysis_finished.emit(video_path, scores)
+                
+    def stop(self):
+        """放弃当前分析并停止线程"""
+        self.cancel()
+        if self.isRunning():
+            self.requests.put(None)
+            self.wait()
@@ -0,0 +1,73 @@
+"""
+胶片条线程 - 在后台用独立的解码器生成进度条下方的缩略图
+"""
+from PyQt6.QtCore import QThread, pyqtSignal
+from app.utils.filmstrip import Filmstrip
+
+import queue
+
+
+class FilmstripThread(QThread):
+    """胶片条生成线程
+
+    只处理最近一次请求的视频，切换视频后放弃正在生成的胶片条。
+    精灵图创建后立即通过 filmstrip_started 交给界面，生成过程中已完成的部分即可显示。
+    """
+    
+    filmstrip_started = pyqtSignal(str, object)     # 视频路径, Filmstrip（正在生成）
+    progress = pyqtSignal(str, int, int)            # 视频路径, 已生成数, 总数
+    filmstrip_finished = pyqtSignal(str, object)    # 视频路径, Filmstrip（失败或取消时为None）
+    
+    # 每生成多少张通知一次进度
+    PROGRESS_STEP = 8
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        
+        self.requests = queue.Queue()
+        self.latest_path = None
+        
+    def generate(self, video_path):
+        """请求生成（或读取缓存的）胶片条"""
+        self.latest_path = video_path
+        self.requests.put(video_path)
+        
+    def cancel(self):
+        """放弃当前的生成"""
+        self.latest_path = None
+        
+    def run(self):
+        """线程主循环，收到 None 时结束"""
+        self.setPriority(QThread.Priority.LowPriority)
+        
+        while True:
+            video_path = self.requests.get()
+            if video_path is None:
+                break
+            if video_path != self.latest_path:
+                continue
+                
+            def on_progress(done, total):
+                if done % self.PROGRESS_STEP == 0 or done == total:
+                    self.progress.emit(video_path, done, total)
+                    
+            try:
+                filmstrip = Filmstrip.load_or_generate(
+                    video_path,
+                    on_start=lambda strip: self.filmstrip_started.emit(video_path, strip),
+                    progress=on_progress,
+                    is_cancelled=lambda: self.latest_path != video_path
+                )
+            except Exception as e:
+                print(f"生成胶片条失败: {e}")
+                filmstrip = None
+                
+            if video_path == self.latest_path:
+                self.filmstrip_finished.emit(video_path, filmstrip)
+                
+    def stop(self):
+        """放弃当前生成并停止线程"""
+        self.cancel()
+        if self.isRunning():
+            self.requests.put(None)
+            self.wait()
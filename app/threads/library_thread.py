@@ -0,0 +1,85 @@
+"""
+视频库扫描线程 - 在后台递归扫描视频目录，分批返回视频及其元数据
+"""
+from PyQt6.QtCore import QThread, pyqtSignal
+from app.utils.video_library import VideoLibrary
+
+import time
+import queue
+
+
+class LibraryScanThread(QThread):
+    """视频库扫描线程
+
+    只扫描最近一次请求的目录，切换目录后放弃正在进行的扫描。
+    找到的视频按批通过 videos_found 发出，列表可以边扫描边显示。
+    """
+    
+    videos_found = pyqtSignal(str, list)    # 扫描的目录, [记录]
+    scan_finished = pyqtSignal(str, int, int)   # 扫描的目录, 视频数, 重新探测的文件数
+    
+    # 每批最多的视频数和最长的间隔(秒)
+    BATCH_SIZE = 64
+    BATCH_INTERVAL = 0.2
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        
+        self.requests = queue.Queue()
+        self.latest_path = None
+        
+    def scan(self, directory):
+        """请求扫描目录"""
+        self.latest_path = directory
+        self.requests.put(directory)
+        
+    def cancel(self):
+        """放弃当前的扫描"""
+        self.latest_path = None
+        
+    def run(self):
+        """线程主循环，收到 None 时结束"""
+        self.setPriority(QThread.Priority.LowPriority)
+        library = VideoLibrary()
+        
+        while True:
+            directory = self.requests.get()
+            if directory is None:
+                break
+            if directory != self.latest_path:
+                continue
+                
+            batch = []
+            last_emit = time.monotonic()
+            
+            def on_entry(entry):
+                nonlocal last_emit
+                batch.append(entry)
+                now = time.monotonic()
+                if len(batch) >= self.BATCH_SIZE or now - last_emit >= self.BATCH_INTERVAL:
+                    self.videos_found.emit(directory, batch[:])
+                    batch.clear()
+                    last_emit = now
+                    
+            try:
+                result = library.scan(
+                    directory, on_entry,
+                    is_cancelled=lambda: self.latest_path != directory
+                )
+            except Exception as e:
+                print(f"扫描视频目录失败: {e}")
+                result = None
+                
+            if directory != self.latest_path:
+                continue
+            if batch:
+                self.videos_found.emit(directory, batch[:])
+            if result is not None:
+                self.scan_finished.emit(directory, *result)
+                
+    def stop(self):
+        """放弃当前扫描并停止线程"""
+        self.cancel()
+        if self.isRunning():
+            self.requests.put(None)
+            self.wait()
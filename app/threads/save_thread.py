@@ -0,0 +1,76 @@
+"""
+标注保存线程 - 在后台编码图像和写入元数据，保存时界面不卡顿
+"""
+from PyQt6.QtCore import QThread, pyqtSignal
+
+import queue
+import threading
+
+
+class AnnotationSaveThread(QThread):
+    """标注保存线程
+
+    保存请求放入有界队列，由本线程依次调用 AnnotationManager.save_annotation。
+    队列满时拒绝新的请求（提交在界面线程中进行，不能等待），避免积压过多的ROI图像占用内存。
+    每项完成后通过 save_finished 信号通知结果和各步骤耗时；关闭前调用 stop() 保存完剩余的请求。
+    """
+    
+    save_finished = pyqtSignal(str, bool, object)   # 图像ID, 是否成功, 耗时(毫秒)
+    
+    def __init__(self, annotation_manager, queue_size=8, parent=None):
+        super().__init__(parent)
+        
+        self.annotation_manager = annotation_manager
+        self.requests = queue.Queue(maxsize=queue_size)
+        
+        # 已提交但尚未写完的请求: {图像ID: 数量}
+        self.pending = {}
+        self.lock = threading.Lock()
+        
+    def submit(self, data):
+        """提交保存请求，返回是否已接受；队列满时不等待，返回False"""
+        image_id = data["image_id"]
+        with self.lock:
+            self.pending[image_id] = self.pending.get(image_id, 0) + 1
+        try:
+            self.requests.put_nowait(data)
+        except queue.Full:
+            with self.lock:
+                self.pending[image_id] -= 1
+                if not self.pending[image_id]:
+                    del self.pending[image_id]
+            return False
+        return True
+        
+    def is_pending(self, image_id):
+        """该图像是否还在等待保存"""
+        with self.lock:
+            return image_id in self.pending
+            
+    def pending_count(self):
+        """等待保存的数量"""
+        with self.lock:
+            return sum(self.pending.values())
+            
+    def run(self):
+        """线程主循环，收到 None 时结束"""
+        while True:
+            data = self.requests.get()
+            if data is None:
+                break
+                
+            image_id = data["image_id"]
+            success = self.annotation_manager.save_annotation(data)
+            times = dict(self.annotation_manager.last_save_times) if success else {}
+            
+            with self.lock:
+                self.pending[image_id] -= 1
+                if not self.pending[image_id]:
+                    del self.pending[image_id]
+            self.save_finished.emit(image_id, success, times)
+            
+    def stop(self):
+        """保存完队列中剩余的请求后停止线程"""
+        if self.isRunning():
+            self.requests.put(None)
+            self.wait()
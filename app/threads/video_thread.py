@@ -1,81 +1,404 @@
 """
-视频读取线程 - 后台处理视频读取（备用，当前版本使用QTimer）
+视频读取线程 - 后台解码视频，作为播放器的播放引擎
 """
 from PyQt6.QtCore import QThread, pyqtSignal
-import cv2
-import numpy as np
+from app.utils.decoder_pool import DecoderPool
+from app.utils.display_pipeline import DisplayPipeline
+from app.utils.frame_buffer import FrameBuffer
+
+import queue
+from collections import deque
 
 
 class VideoReaderThread(QThread):
-    """视频读取线程"""
+    """视频读取线程
+
+    所有解码都在本线程中完成：
+    - 播放时解码结果放入有界队列 frame_queue，由播放器按节拍取用
+    - 单帧请求（加载、跳转、逐帧）的结果通过 frame_ready 信号返回
+    - 后退和倒放时整段解码目标所在的GOP，缓冲后倒序取用
+    - 暂停空闲时以低优先级预取当前帧前后的帧，收到新命令立即取消
+    - 每帧在本线程内缩放到显示尺寸，界面线程只负责贴图
+    - 跳转类命令只执行最新的一条：排队中的旧跳转直接丢弃，正在进行的向前解码被中止
+    - 最近打开过的几个视频的解码器保留在解码器池中，切换回来时不必重新打开
+    """
     
-    frame_ready = pyqtSignal(np.ndarray, int)  # 帧数据, 帧号
+    frame_ready = pyqtSignal(object, object, int)  # 原始帧, 显示帧(FrameBuffer), 帧号
+    preview_ready = pyqtSignal(object, int, int)   # 显示帧(失败时为None), 实际解码的帧号, 请求的帧号
+    # 总帧数, 帧率, 起始帧号, SeekIndex（没有时为None）, 加载命令的generation
+    video_opened = pyqtSignal(int, float, int, object, int)
     video_finished = pyqtSignal()
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, parent=None):
+    # 没有关键帧索引时，倒放每次向前解码的帧数
+    FALLBACK_GOP_SIZE = 30
+    
+    # 改变解码位置的命令：发出后，之前尚未完成的跳转类命令都已过期
+    POSITION_COMMANDS = ("load", "seek", "step_back", "preview", "prefetch")
+    # 过期后可以直接丢弃的命令（加载必须执行）
+    SUPERSEDED_COMMANDS = ("seek", "step_back", "preview", "prefetch")
+    
+    def __init__(self, frame_cache=None, display_cache=None, queue_size=8,
+                 prefetch_radius=8, pool_size=4, parent=None):
         super().__init__(parent)
         
         self.video_path = None
-        self.cap = None
+        self.load_generation = 0    # 最近一次加载命令的generation，界面据此丢弃过期的 video_opened
+        self.decoder = None
+        self.decoder_pool = DecoderPool(pool_size, on_changed=self.invalidate_video)
+        self.frame_cache = frame_cache
+        self.display_cache = display_cache
+        self.display_pipeline = DisplayPipeline()
         self.is_running = False
         self.is_paused = True
         self.playback_speed = 1.0
-        self.seek_frame = -1
+        self.direction = 1          # 播放方向: 1=正放, -1=倒放
+        self.play_position = 0      # 播放时下一个要送出的帧号
+        self.pending_item = None    # 已解码但尚未放入队列的帧
+        
+        # GOP缓冲: {帧号: 帧}，后退和倒放时从中倒序取帧
+        self.gop_buffer = {}
+        self.frame_bytes = 0        # 单帧字节数，用于计算缓冲容量
+        
+        # 预取: 每个任务是一个逐帧解码的生成器
+        self.prefetch_radius = prefetch_radius
+        self.prefetch_jobs = deque()
+        self.prefetched_frames = set()  # 由预取解码放入缓存的帧号
+        
+        # 播放帧队列: (generation, 帧号, 原始帧, 显示帧)，原始帧为None表示视频结束
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        # 命令队列: 加载、跳转、播放控制按顺序在线程内执行
+        self.commands = queue.Queue()
+        
+        # 每条命令递增，播放器据此丢弃过期的队列帧
+        self.generation = 0
+        self.active_generation = 0
+        # 最近一条改变解码位置的命令
+        self.position_generation = 0
+        self.skipped_commands = 0   # 过期未执行的跳转
+        self.cancelled_decodes = 0  # 执行中被新跳转中止的解码
         
-    def load_video(self, video_path):
-        """加载视频"""
+    def load_video(self, video_path, start_frame=0):
+        """加载视频，打开后显示 start_frame"""
         self.video_path = video_path
+        self.send_command("load", (video_path, start_frame))
+        self.load_generation = self.generation
+        
+    def send_command(self, name, arg=None):
+        """向线程发送命令"""
+        self.generation += 1
+        if name in self.POSITION_COMMANDS:
+            self.position_generation = self.generation
+        self.commands.put((name, arg, self.generation))
         
     def run(self):
         """线程主循环"""
-        if self.video_path is None:
+        self.is_running = True
+        
+        while self.is_running:
+            idle = self.is_paused or self.decoder is None
+            prefetching = idle and bool(self.prefetch_jobs)
+            try:
+                if idle and not prefetching:
+                    command = self.commands.get(timeout=0.05)
+                else:
+                    command = self.commands.get_nowait()
+            except queue.Empty:
+                command = None
+                
+            if command is not None:
+                self.handle_command(command)
+            elif prefetching:
+                self.prefetch_step()
+            elif not idle:
+                self.decode_next()
+                
+        self.release_decoder()
+        
+    def handle_command(self, command):
+        """执行一条命令"""
+        name, arg, generation = command
+        if name in self.SUPERSEDED_COMMANDS and generation < self.position_generation:
+            self.skipped_commands += 1
             return
             
-        self.cap = cv2.VideoCapture(self.video_path)
+        self.active_generation = generation
+        self.pending_item = None
+        self.clear_queue()
+        self.cancel_prefetch()
+        
+        if name == "load":
+            self.open_decoder(*arg)
+        elif name == "seek":
+            self.decode_frame(arg)
+        elif name == "step_back":
+            self.decode_frame(arg, backward=True)
+        elif name == "preview":
+            self.decode_preview(arg)
+        elif name == "play":
+            start_frame, direction = arg
+            self.direction = direction
+            self.play_position = start_frame + direction
+            self.is_paused = False
+        elif name == "pause":
+            self.is_paused = True
+            if arg is not None:
+                self.start_prefetch(arg)
+        elif name == "prefetch":
+            self.start_prefetch(arg)
+            
+    def open_decoder(self, video_path, start_frame=0):
+        """从解码器池取得视频的解码器（首次打开时建立关键帧索引）并解码起始帧"""
+        self.gop_buffer = {}
+        self.decoder = None
+        self.is_paused = True
+        self.prefetched_frames = set()
         
-        if not self.cap.isOpened():
+        decoder = self.decoder_pool.acquire(video_path)
+        if decoder is None:
             self.error_occurred.emit("无法打开视频文件")
             return
             
-        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
-        self.is_running = True
+        self.decoder = decoder
+        start_frame = max(0, min(start_frame, decoder.frame_count - 1))
+        self.video_opened.emit(
+            decoder.frame_count, decoder.fps, start_frame, decoder.index, self.active_generation
+        )
+        self.decode_frame(start_frame)
         
-        while self.is_running:
-            # 处理跳转请求
-            if self.seek_frame >= 0:
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.seek_frame)
-                self.seek_frame = -1
+    def invalidate_video(self, video_path):
+        """视频文件已变化（被替换），丢弃按路径缓存的旧解码帧和显示帧"""
+        for cache in (self.frame_cache, self.display_cache):
+            if cache is not None:
+                cache.clear(video_path)
                 
-            if not self.is_paused:
-                ret, frame = self.cap.read()
+    def release_decoder(self):
+        """释放解码器池中的所有视频"""
+        self.gop_buffer = {}
+        self.decoder = None
+        self.decoder_pool.close_all()
+        
+    def decode_frame(self, frame_number, backward=False):
+        """解码指定帧并通过 frame_ready 返回；有更新的跳转请求时中止"""
+        if self.decoder is None:
+            return
+            
+        generation = self.active_generation
+        is_cancelled = lambda: self.position_generation > generation
+        if backward:
+            frame = self.read_backward(frame_number, is_cancelled)
+        else:
+            frame = self.read_forward(frame_number, is_cancelled)
+            
+        if frame is None and is_cancelled():
+            self.cancelled_decodes += 1
+        elif frame is not None:
+            self.play_position = frame_number + self.direction
+            display = self.display_frame(frame_number, frame, smooth=True)
+            self.frame_ready.emit(frame, display, frame_number)
+            if self.is_paused:
+                self.start_prefetch(frame_number)
                 
-                if ret:
-                    frame_number = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-                    self.frame_ready.emit(frame, frame_number)
+    def decode_preview(self, frame_number):
+        """拖动进度条时的快速预览：只解码目标帧之前最近的关键帧（已缓存的目标帧直接使用），
+        结果通过 preview_ready 返回"""
+        if self.decoder is None:
+            return
+            
+        decoded_number, frame = frame_number, self.cached_frame(frame_number)
+        if frame is None:
+            decoded_number, frame = self.decoder.read_keyframe(frame_number)
+            frame = self.cache_frame(decoded_number, frame)
+            
+        display = None
+        if frame is not None:
+            display = self.display_frame(decoded_number, frame, smooth=True)
+        self.preview_ready.emit(display, decoded_number, frame_number)
+        
+    def read_forward(self, frame_number, is_cancelled=None):
+        """正向读取一帧（优先使用缓存）"""
+        frame = self.cached_frame(frame_number)
+        if frame is None:
+            frame = self.cache_frame(frame_number, self.decoder.read(frame_number, is_cancelled))
+        return frame
+        
+    def read_backward(self, frame_number, is_cancelled=None):
+        """反向读取一帧：不在缓冲中时解码其所在的整个GOP"""
+        frame = self.gop_buffer.pop(frame_number, None)
+        if frame is None:
+            frame = self.cached_frame(frame_number)
+        if frame is None:
+            self.fill_gop_buffer(frame_number, is_cancelled)
+            frame = self.gop_buffer.pop(frame_number, None)
+        return frame
+        
+    def fill_gop_buffer(self, frame_number, is_cancelled=None):
+        """从所在GOP的关键帧解码到目标帧，结果放入缓冲
+
+        GOP超过缓冲容量时只保留靠近目标帧的部分。
+        """
+        if self.decoder.index is not None:
+            start = self.decoder.index.keyframe_before(frame_number)
+        else:
+            start = max(0, frame_number - self.FALLBACK_GOP_SIZE + 1)
+        start = max(start, frame_number - self.gop_capacity() + 1)
+        
+        self.gop_buffer = {}
+        for n, frame in self.decoder.read_range(start, frame_number, is_cancelled):
+            self.gop_buffer[n] = self.cache_frame(n, frame)
+            
+    def gop_capacity(self):
+        """GOP缓冲最多容纳的帧数（与帧缓存预算一致）"""
+        if self.frame_cache is None or not self.frame_bytes:
+            return self.FALLBACK_GOP_SIZE
+        return max(1, self.frame_cache.max_bytes // self.frame_bytes)
+        
+    def start_prefetch(self, center):
+        """安排预取 center 前后各 prefetch_radius 帧（先预取之后的帧，再预取之前的帧）"""
+        self.prefetch_jobs.clear()
+        if self.decoder is None or self.frame_cache is None or self.prefetch_radius <= 0:
+            return
+            
+        # 预取窗口不超过缓存容量的三分之一，避免挤掉刚看过的帧
+        radius = min(self.prefetch_radius, max(1, self.gop_capacity() // 3))
+        last_frame = self.decoder.frame_count - 1
+        
+        # 有新命令到达时，正在进行的定位和向前解码立即放弃（预取随后被新命令取消）
+        is_cancelled = lambda: not self.commands.empty()
+        ranges = [
+            (center + 1, min(center + radius, last_frame)),
+            (max(0, center - radius), center - 1)
+        ]
+        for start, end in ranges:
+            if start > end:
+                continue
+            if all(self.frame_cache.contains(self.decoder.video_path, n)
+                   for n in range(start, end + 1)):
+                continue
+            self.prefetch_jobs.append(self.decoder.read_range(start, end, is_cancelled))
+            
+    def prefetch_step(self):
+        """执行一步预取（解码一帧），以低优先级运行"""
+        if self.priority() != QThread.Priority.LowestPriority:
+            self.setPriority(QThread.Priority.LowestPriority)
+            
+        item = next(self.prefetch_jobs[0], None)
+        if item is None:
+            self.prefetch_jobs.popleft()
+            return
+            
+        frame_number, frame = item
+        self.cache_frame(frame_number, frame)
+        self.prefetched_frames.add(frame_number)
+        self.yieldCurrentThread()
+        
+    def cancel_prefetch(self):
+        """取消预取并恢复正常优先级"""
+        self.prefetch_jobs.clear()
+        if self.isRunning() and self.priority() != QThread.Priority.NormalPriority:
+            self.setPriority(QThread.Priority.NormalPriority)
+            
+    def cached_frame(self, frame_number):
+        """从帧缓存读取（不计入命中统计）"""
+        if self.frame_cache is None:
+            return None
+        return self.frame_cache.get(self.decoder.video_path, frame_number, count=False)
+        
+    def cache_frame(self, frame_number, frame):
+        """解码结果包装为只读共享的FrameBuffer并放入帧缓存
+
+        暂停时同时生成平滑缩放的显示帧。返回包装后的帧。
+        """
+        if frame is None:
+            return None
+        frame = FrameBuffer.wrap(frame)
+        self.frame_bytes = frame.nbytes
+        if self.frame_cache is not None:
+            self.frame_cache.put(self.decoder.video_path, frame_number, frame)
+        if self.is_paused:
+            self.display_frame(frame_number, frame, smooth=True)
+        return frame
+        
+    def display_frame(self, frame_number, frame, smooth):
+        """生成显示帧；平滑缩放的结果放入显示缓存供逐帧浏览复用"""
+        if not smooth or self.display_cache is None:
+            return self.display_pipeline.process(frame, smooth)
+            
+        key = self.display_pipeline.cache_key(self.decoder.video_path)
+        display = self.display_cache.get(key, frame_number, count=False)
+        if display is None:
+            display = self.display_pipeline.process(frame, smooth=True)
+            self.display_cache.put(key, frame_number, display)
+        return display
+        
+    def decode_next(self):
+        """播放时解码下一帧并放入队列"""
+        if self.pending_item is None:
+            frame_number = self.play_position
+            frame = None
+            if 0 <= frame_number < self.decoder.frame_count:
+                if self.direction > 0:
+                    frame = self.read_forward(frame_number)
                 else:
-                    self.video_finished.emit()
-                    self.is_paused = True
+                    frame = self.read_backward(frame_number)
                     
-                # 控制播放速度
-                delay_ms = int(1000 / (fps * self.playback_speed))
-                self.msleep(delay_ms)
+            if frame is not None:
+                display = self.display_frame(frame_number, frame, smooth=False)
+                self.pending_item = (self.active_generation, frame_number, frame, display)
+                self.play_position += self.direction
             else:
-                self.msleep(50)  # 暂停时减少CPU占用
+                self.pending_item = (self.active_generation, -1, None, None)
+                
+        if not self.put_frame(self.pending_item):
+            return
+            
+        if self.pending_item[2] is None:
+            self.is_paused = True
+            self.video_finished.emit()
+        self.pending_item = None
+        
+    def put_frame(self, item):
+        """放入播放队列；队列满时等待，有新命令时放弃"""
+        while self.is_running:
+            try:
+                self.frame_queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                if not self.commands.empty():
+                    return False
+        return False
+        
+    def clear_queue(self):
+        """清空播放队列"""
+        while True:
+            try:
+                self.frame_queue.get_nowait()
+            except queue.Empty:
+                break
                 
-        self.cap.release()
+    def play(self, start_frame=0, direction=1):
+        """从 start_frame 之后开始播放，direction=-1 时倒放"""
+        self.send_command("play", (start_frame, direction))
         
-    def play(self):
-        """播放"""
-        self.is_paused = False
+    def pause(self, frame_number=None):
+        """暂停；给出当前帧号时在空闲时预取其前后的帧"""
+        self.send_command("pause", frame_number)
         
-    def pause(self):
-        """暂停"""
-        self.is_paused = True
+    def prefetch_around(self, frame_number):
+        """请求预取指定帧前后的帧"""
+        self.send_command("prefetch", frame_number)
         
     def seek(self, frame_number):
         """跳转到指定帧"""
-        self.seek_frame = frame_number
+        self.send_command("seek", frame_number)
+        
+    def preview(self, frame_number):
+        """请求指定位置的关键帧预览（拖动进度条时使用）"""
+        self.send_command("preview", frame_number)
+        
+    def step_back(self, frame_number):
+        """后退到指定帧（解码并缓冲其所在GOP）"""
+        self.send_command("step_back", frame_number)
         
     def set_speed(self, speed):
         """设置播放速度"""
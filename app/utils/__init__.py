@@ -1,4 +1,17 @@
 """
 工具模块
 """
-from .file_utils import ConfigManager, AnnotationManager
+from .file_utils import ConfigManager, AnnotationManager, get_video_cache_path, prune_cache_dir
+from .annotation_store import AnnotationStore
+from .video_index import SeekIndex
+from .frame_decoder import FrameDecoder
+from .decoder_pool import DecoderPool
+from .frame_cache import FrameCache
+from .frame_buffer import FrameBuffer
+from .display_pipeline import DisplayPipeline
+from .image_pyramid import ImagePyramid
+from .reference_renderer import ReferenceRenderer, draw_points
+from .frame_scores import FrameScores
+from .filmstrip import Filmstrip
+from .video_library import VideoLibrary
+from .search_index import SearchIndex
@@ -0,0 +1,330 @@
+"""
+标注存储 - 只追加的JSON Lines日志，定期压缩
+"""
+import os
+import json
+import threading
+
+
+def video_key(video):
+    """视频的标注键：去掉目录和扩展名的文件名
+
+    标注记录的 source_video 和图像ID都只含文件名（不含扩展名），视频路径按同样的规则换算，
+    列表中的视频和已保存的标注（包括旧记录）才能对应起来。没有来源视频时原样返回。
+    """
+    if not video:
+        return video
+    return os.path.normcase(os.path.splitext(os.path.basename(video))[0])
+
+
+def point_counts(data):
+    """标注的 (保留点数, 去除点数)；旧记录没有计数字段时由标记点统计"""
+    if "keep_count" in data and "remove_count" in data:
+        return data["keep_count"], data["remove_count"]
+    points = data.get("points") or []
+    return (
+        sum(1 for p in points if p.get("type") == "keep"),
+        sum(1 for p in points if p.get("type") == "remove")
+    )
+
+
+class AnnotationStore:
+    """只追加的标注元数据存储
+
+    每次保存或删除只向日志文件末尾追加一行记录：
+        {"op": "put", "id": 图像ID, "data": {...}}
+        {"op": "delete", "id": 图像ID}
+    启动时读取一次日志重建内存索引，之后的读取都走内存。
+    除按图像ID的索引外，还按来源视频和 (来源视频, 帧号) 建立二级索引，
+    并随每次保存和删除增量维护每个视频的汇总（标注数、最后标注的帧、保留/去除点总数），
+    视频按 video_key（文件名）归并。
+    日志文件的大小或修改时间与本对象最后一次读写时不同（被其他程序修改）时，
+    下次读取前自动重新加载。
+    被覆盖或删除的旧记录累积过多时，把当前内容重写为压缩后的日志。
+    首次使用时若只有旧版 annotations.json，自动迁移为日志格式。
+    """
+    
+    # 过期记录数超过该值且超过有效记录数时压缩日志
+    COMPACT_MIN_STALE = 1000
+    
+    def __init__(self, journal_path, legacy_path=None):
+        self.journal_path = journal_path
+        self.legacy_path = legacy_path
+        self.annotations = {}
+        self.record_count = 0       # 日志中的记录行数（含过期记录）
+        self.file_state = None      # 最后一次读写后日志文件的 (大小, 修改时间)
+        self.lock = threading.Lock()
+        
+        # 二级索引
+        self.by_video = {}          # 标注键 -> {图像ID}
+        self.by_frame = {}          # (标注键, 帧号) -> {图像ID}
+        # 视频汇总: 标注键 -> {"count", "keep_count", "remove_count", "images": {图像ID: (保存时间, 序号, 帧号)}}
+        self.video_stats = {}
+        self.sequence = 0           # 加入索引的顺序（日志顺序），保存时间相同或缺失时区分先后
+        
+        # 变更监听者 listener(操作, 图像ID, 元数据)，操作为 put/delete/reload
+        self.listeners = []
+        
+        self.load()
+        
+    def load(self):
+        """读取日志重建内存索引（必要时先迁移旧版JSON）"""
+        with self.lock:
+            self.read_journal(repair=True)
+            
+    def read_journal(self, repair=False):
+        """读取整个日志重建内存数据（调用方持有锁）
+
+        repair=True 时若有写入中断留下的损坏行，重写日志去掉这些行。
+        """
+        self.annotations = {}
+        self.record_count = 0
+        
+        if not os.path.exists(self.journal_path):
+            self.migrate_legacy()
+            self.rebuild_index()
+            return
+            
+        damaged = False
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 写入中断留下的半行记录，跳过
+                        print(f"跳过损坏的标注记录: {line[:80]}")
+                        damaged = True
+                        continue
+                    self.apply(record)
+                    self.record_count += 1
+        except Exception as e:
+            print(f"加载标注日志失败: {e}")
+            return
+        finally:
+            self.rebuild_index()
+            self.file_state = self.stat_journal()
+            
+        if damaged and repair:
+            # 重写日志去掉损坏的行，保证之后追加的记录从新行开始
+            self.compact()
+        else:
+            self.compact_if_needed()
+            
+    def migrate_legacy(self):
+        """把旧版 annotations.json 迁移为日志格式（调用方持有锁）"""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+            
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                self.annotations = json.load(f)
+            self.compact()
+            # 保留旧文件作为备份，避免之后被误当作当前数据
+            os.replace(self.legacy_path, self.legacy_path + ".bak")
+            print(f"已迁移标注数据: {len(self.annotations)} 条")
+        except Exception as e:
+            print(f"迁移标注数据失败: {e}")
+            
+    def stat_journal(self):
+        """日志文件的 (大小, 修改时间)，不存在时返回None"""
+        try:
+            stat = os.stat(self.journal_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+        
+    def refresh(self):
+        """日志文件被其他程序修改过时重新加载，返回是否重新加载"""
+        with self.lock:
+            if self.stat_journal() == self.file_state:
+                return False
+            self.read_journal()
+        self.notify("reload", None, None)
+        return True
+        
+    def apply(self, record):
+        """把一条日志记录应用到内存数据（不更新二级索引）"""
+        image_id = record.get("id")
+        if record.get("op") == "put":
+            self.annotations[image_id] = record.get("data", {})
+        elif record.get("op") == "delete":
+            self.annotations.pop(image_id, None)
+            
+    def index_add(self, image_id, data):
+        """把标注加入二级索引（调用方持有锁）"""
+        video = video_key(data.get("source_video"))
+        self.by_video.setdefault(video, set()).add(image_id)
+        self.by_frame.setdefault((video, data.get("frame_number")), set()).add(image_id)
+        
+        if video:
+            stats = self.video_stats.setdefault(
+                video, {"count": 0, "keep_count": 0, "remove_count": 0, "images": {}}
+            )
+            keep_count, remove_count = point_counts(data)
+            stats["count"] += 1
+            stats["keep_count"] += keep_count
+            stats["remove_count"] += remove_count
+            self.sequence += 1
+            stats["images"][image_id] = (
+                data.get("created_at") or "", self.sequence, data.get("frame_number")
+            )
+            
+    def index_remove(self, image_id, data):
+        """把标注移出二级索引（调用方持有锁）"""
+        video = video_key(data.get("source_video"))
+        frame_key = (video, data.get("frame_number"))
+        for index, key in ((self.by_video, video), (self.by_frame, frame_key)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(image_id)
+                if not ids:
+                    del index[key]
+                    
+        stats = self.video_stats.get(video) if video else None
+        if stats is not None:
+            keep_count, remove_count = point_counts(data)
+            stats["count"] -= 1
+            stats["keep_count"] -= keep_count
+            stats["remove_count"] -= remove_count
+            stats["images"].pop(image_id, None)
+            if stats["count"] <= 0:
+                del self.video_stats[video]
+                
+    def rebuild_index(self):
+        """按当前数据重建二级索引（调用方持有锁）"""
+        self.by_video = {}
+        self.by_frame = {}
+        self.video_stats = {}
+        self.sequence = 0
+        for image_id, data in self.annotations.items():
+            self.index_add(image_id, data)
+            
+    def append(self, record):
+        """追加一条记录到日志并应用（调用方持有锁）"""
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            
+        image_id = record["id"]
+        old = self.annotations.get(image_id)
+        if old is not None:
+            self.index_remove(image_id, old)
+        self.apply(record)
+        if record["op"] == "put":
+            self.index_add(image_id, record["data"])
+            
+        self.record_count += 1
+        self.file_state = self.stat_journal()
+        self.compact_if_needed()
+        
+    def compact_if_needed(self):
+        """过期记录过多时压缩日志（调用方持有锁）"""
+        stale = self.record_count - len(self.annotations)
+        if stale > self.COMPACT_MIN_STALE and stale > len(self.annotations):
+            self.compact()
+            
+    def compact(self):
+        """把当前内容重写为新日志，写完后原子替换（调用方持有锁）"""
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for image_id, data in self.annotations.items():
+                record = {"op": "put", "id": image_id, "data": data}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.journal_path)
+        self.record_count = len(self.annotations)
+        self.file_state = self.stat_journal()
+        
+    def add_listener(self, listener):
+        """注册变更监听者（可能在保存线程中被调用）"""
+        with self.lock:
+            self.listeners.append(listener)
+            
+    def remove_listener(self, listener):
+        """注销变更监听者"""
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+                
+    def notify(self, op, image_id, data):
+        """通知所有监听者（不持有锁调用，监听者可以再读取本对象）"""
+        with self.lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(op, image_id, data)
+            except Exception as e:
+                print(f"标注变更通知失败: {e}")
+                
+    def get(self, image_id):
+        """获取单个标注，不存在返回None"""
+        self.refresh()
+        with self.lock:
+            return self.annotations.get(image_id)
+            
+    def get_all(self):
+        """获取所有标注 {图像ID: 元数据}（浅拷贝）"""
+        self.refresh()
+        with self.lock:
+            return dict(self.annotations)
+            
+    def find_by_video(self, source_video):
+        """获取某个视频的所有标注 {图像ID: 元数据}；视频可以是路径或 source_video"""
+        self.refresh()
+        with self.lock:
+            ids = self.by_video.get(video_key(source_video), ())
+            return {image_id: self.annotations[image_id] for image_id in ids}
+            
+    def find_by_frame(self, source_video, frame_number):
+        """获取某个视频某一帧的所有标注 {图像ID: 元数据}；视频可以是路径或 source_video"""
+        self.refresh()
+        with self.lock:
+            ids = self.by_frame.get((video_key(source_video), frame_number), ())
+            return {image_id: self.annotations[image_id] for image_id in ids}
+            
+    def get_video_stats(self, source_video=None):
+        """视频的标注汇总 {"count", "last_frame", "keep_count", "remove_count"}，没有标注时返回None；
+        不指定视频时返回所有视频 {标注键: 汇总}；视频可以是路径或 source_video"""
+        self.refresh()
+        with self.lock:
+            if source_video is not None:
+                stats = self.video_stats.get(video_key(source_video))
+                return None if stats is None else self.summarize(stats)
+            return {key: self.summarize(stats) for key, stats in self.video_stats.items()}
+            
+    def summarize(self, stats):
+        """去掉内部的逐图记录，给出最后保存的标注所在的帧（按保存时间，其次按日志顺序；调用方持有锁）"""
+        latest = max(stats["images"].values(), default=None)
+        return {
+            "count": stats["count"],
+            "last_frame": latest[2] if latest is not None else None,
+            "keep_count": stats["keep_count"],
+            "remove_count": stats["remove_count"]
+        }
+        
+    def put(self, image_id, data):
+        """保存单个标注"""
+        with self.lock:
+            self.append({"op": "put", "id": image_id, "data": data})
+        self.notify("put", image_id, data)
+        
+    def delete(self, image_id):
+        """删除单个标注"""
+        with self.lock:
+            data = self.annotations.get(image_id)
+            if data is None:
+                return
+            self.append({"op": "delete", "id": image_id})
+        self.notify("delete", image_id, data)
+        
+    def replace_all(self, annotations):
+        """用给定内容整体替换所有标注"""
+        with self.lock:
+            self.annotations = dict(annotations)
+            self.rebuild_index()
+            self.compact()
+        self.notify("reload", None, None)
@@ -0,0 +1,75 @@
+"""
+解码器池 - 保持最近使用的几个视频的解码器处于打开状态，切换回来时无需重新打开
+"""
+import os
+from collections import OrderedDict
+
+from .frame_decoder import FrameDecoder
+
+
+def file_state(path):
+    """文件的 (大小, 修改时间)，不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class DecoderPool:
+    """按最近使用顺序保留的已打开解码器
+
+    每个解码器保留自己的解码位置和关键帧索引，切换回最近用过的视频时不需要重新打开、探测和定位；
+    解码出的帧本来就按视频路径存放在共享的帧缓存中。打开的解码器超过上限时释放最久未用的一个。
+    视频文件的大小或修改时间变化后，池中的解码器作废并重新打开。打开过的视频（包括已被释放的）
+    再次打开时文件已变化，调用 on_changed(视频路径)，使用方据此丢弃按路径缓存的旧帧。
+    只在解码线程中使用，不加锁。
+    """
+    
+    def __init__(self, max_open=4, on_changed=None):
+        self.max_open = max(1, max_open)
+        self.on_changed = on_changed
+        self.decoders = OrderedDict()   # 视频路径 -> (FrameDecoder, (大小, 修改时间))
+        self.opened_states = {}         # 打开过的视频路径 -> 最后一次打开时的 (大小, 修改时间)
+        self.hits = 0
+        self.misses = 0
+        
+    def __len__(self):
+        return len(self.decoders)
+        
+    def __contains__(self, video_path):
+        return video_path in self.decoders
+        
+    def acquire(self, video_path):
+        """取得视频的解码器：池中已有则直接返回（保留其解码位置），否则打开新的；无法打开时返回None"""
+        state = file_state(video_path)
+        item = self.decoders.pop(video_path, None)
+        if item is not None:
+            decoder, opened_state = item
+            if opened_state == state and decoder.is_open():
+                self.hits += 1
+                self.decoders[video_path] = item
+                return decoder
+            decoder.release()
+            
+        self.misses += 1
+        if video_path in self.opened_states and self.opened_states[video_path] != state:
+            if self.on_changed is not None:
+                self.on_changed(video_path)
+        self.opened_states[video_path] = state
+        
+        decoder = FrameDecoder(video_path)
+        if not decoder.open():
+            return None
+            
+        self.decoders[video_path] = (decoder, state)
+        while len(self.decoders) > self.max_open:
+            _, (old, _) = self.decoders.popitem(last=False)
+            old.release()
+        return decoder
+        
+    def close_all(self):
+        """释放所有解码器"""
+        for decoder, _ in self.decoders.values():
+            decoder.release()
+        self.decoders.clear()
@@ -0,0 +1,49 @@
+"""
+显示管线 - 在解码线程中先缩放到显示尺寸，界面线程直接贴图
+"""
+import cv2
+
+from .frame_buffer import FrameBuffer
+
+
+class DisplayPipeline:
+    """显示管线
+
+    在解码线程中把全分辨率帧缩放到显示区域大小（保持宽高比）。
+    结果保持BGR顺序，由 Format_BGR888 的QImage直接显示，不做颜色转换。
+    暂停时用INTER_AREA平滑缩放，播放时用INTER_LINEAR快速缩放。
+    """
+    
+    def __init__(self, width=0, height=0):
+        self.target_size = (width, height)
+        
+    def set_target_size(self, width, height):
+        """设置显示区域大小"""
+        self.target_size = (max(0, width), max(0, height))
+        
+    def fit_size(self, width, height):
+        """按显示区域计算保持宽高比的目标尺寸"""
+        target_w, target_h = self.target_size
+        if target_w <= 0 or target_h <= 0:
+            return width, height
+            
+        scale = min(target_w / width, target_h / height)
+        return max(1, int(width * scale)), max(1, int(height * scale))
+        
+    def process(self, frame, smooth=True):
+        """缩放到显示尺寸，返回可直接显示的FrameBuffer"""
+        frame = FrameBuffer.wrap(frame)
+        h, w = frame.shape[:2]
+        display_w, display_h = self.fit_size(w, h)
+        
+        if (display_w, display_h) == (w, h):
+            return frame
+            
+        interpolation = cv2.INTER_AREA if smooth else cv2.INTER_LINEAR
+        return FrameBuffer(
+            cv2.resize(frame.array, (display_w, display_h), interpolation=interpolation)
+        )
+        
+    def cache_key(self, video_path):
+        """显示缓存的键前缀（包含显示尺寸，尺寸变化后旧结果自然失效）"""
+        return (video_path,) + self.target_size
@@ -2,9 +2,122 @@
 文件操作工具 - 配置管理和标注保存
 """
 import os
+import glob
 import json
+import time
+import hashlib
 import cv2
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .annotation_store import AnnotationStore
+
+
+CACHE_DIR = ".cache"
+
+# 支持的输出图像格式: 格式名 -> 扩展名
+IMAGE_FORMATS = {"png": ".png", "jpg": ".jpg", "webp": ".webp"}
+
+# 支持的视频格式
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
+
+
+# 已提示过的无效格式配置，避免每次保存都重复提示
+warned_format_settings = set()
+
+
+def warn_format_setting(message):
+    """提示一次无效的格式配置"""
+    if message not in warned_format_settings:
+        warned_format_settings.add(message)
+        print(message)
+
+
+def format_param(output_format, key, default, low, high):
+    """读取格式配置中的数值参数并限制在 [low, high]，无法解析时使用默认值"""
+    value = output_format.get(key, default)
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        warn_format_setting(f"图像格式参数 {key}={value!r} 无效，使用默认值 {default}")
+        return default
+    if not low <= number <= high:
+        warn_format_setting(f"图像格式参数 {key}={value} 超出范围 {low}-{high}，已取边界值")
+    return max(low, min(number, high))
+
+
+def get_imwrite_params(output_format):
+    """根据输出格式配置获取 (扩展名, cv2.imwrite参数)
+
+    不支持的格式提示后按PNG保存；质量和压缩级别限制在OpenCV接受的范围内。
+    """
+    fmt = output_format.get("format", "png")
+    if fmt == "jpg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, format_param(output_format, "jpeg_quality", 95, 0, 100)]
+    elif fmt == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, format_param(output_format, "webp_quality", 90, 1, 100)]
+    else:
+        if fmt != "png":
+            warn_format_setting(
+                f"不支持的图像格式 {fmt!r}（可选 {' / '.join(IMAGE_FORMATS)}），改用PNG保存"
+            )
+            fmt = "png"
+        params = [cv2.IMWRITE_PNG_COMPRESSION, format_param(output_format, "png_compression", 1, 0, 9)]
+    return IMAGE_FORMATS[fmt], params
+
+
+def write_image_file(output_dir, image_id, image, output_format):
+    """按格式配置编码并写入图像，删除同名的其他格式文件，返回文件路径"""
+    ext, params = get_imwrite_params(output_format)
+    path = os.path.join(output_dir, f"{image_id}{ext}")
+    if not cv2.imwrite(path, image, params):
+        raise IOError(f"写入图像失败: {path}")
+        
+    # 格式改变后删除同名的旧格式文件
+    for other_ext in IMAGE_FORMATS.values():
+        other_path = os.path.join(output_dir, f"{image_id}{other_ext}")
+        if other_ext != ext and os.path.exists(other_path):
+            os.remove(other_path)
+            
+    return path
+
+
+def get_video_cache_path(video_path, kind, ext, extra=""):
+    """获取视频（或其他源文件）的旁路缓存文件路径
+
+    文件名包含源文件路径、大小和修改时间的摘要，源文件变化后旧缓存自动失效。
+    extra 为额外的缓存键，例如渲染所用的参数。
+    """
+    stat = os.stat(video_path)
+    key = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    if extra:
+        key += f"|{extra}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    
+    cache_dir = os.path.join(CACHE_DIR, kind)
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"{stem}_{digest}{ext}")
+
+
+def prune_cache_dir(cache_dir, max_files, pattern="*.jpg"):
+    """缓存目录中的文件超过 max_files 个时删除修改时间最早的"""
+    files = glob.glob(os.path.join(cache_dir, pattern))
+    if len(files) <= max_files:
+        return
+        
+    def mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0    # 已被其他线程删除
+            
+    files.sort(key=mtime)
+    for path in files[:len(files) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
 class ConfigManager:
@@ -14,6 +127,25 @@ class ConfigManager:
     
     DEFAULT_CONFIG = {
         "last_video_dir": "./video",
+        "frame_cache_mb": 512,
+        "prefetch_frames": 8,
+        # 保持打开的视频解码器数，切换回最近看过的视频时无需重新打开
+        "decoder_pool_size": 4,
+        # 进度条上标出的候选关键帧数（按运动、场景变化和清晰度评分），0 = 不分析
+        "suggested_frames": 20,
+        # 发送帧时在前后 snap_radius 帧（已缓存的）中找最清晰的一帧:
+        # off = 不查找; suggest = 提示可改用; auto = 自动替换（保留已画的ROI和标记点）
+        "snap_mode": "suggest",
+        "snap_radius": 3,
+        # 每个输出目录的图像格式: format = png / jpg / webp
+        # png_compression: 0-9，越大文件越小、编码越慢；jpeg_quality: 0-100；webp_quality: 1-100
+        # 不支持的格式按png保存，超出范围的数值取边界值
+        "output_formats": {
+            "Annotation": {"format": "png", "png_compression": 1},
+            "Reference": {"format": "png", "png_compression": 1}
+        },
+        # 参考图保存方式: file = 保存带标记的图像文件; overlay = 不保存，查看和导出时按标记点现场绘制
+        "reference_mode": "file",
         "labels": {
             "疏除": "#FF4444",
             "保留": "#44FF44"
@@ -56,6 +188,40 @@ class ConfigManager:
         self.config["labels"] = labels
         self.save_config()
         
+    def get_frame_cache_mb(self):
+        """获取解码帧缓存预算(MB)"""
+        return self.config.get("frame_cache_mb", self.DEFAULT_CONFIG["frame_cache_mb"])
+        
+    def get_prefetch_frames(self):
+        """获取暂停时向前后各预取的帧数"""
+        return self.config.get("prefetch_frames", self.DEFAULT_CONFIG["prefetch_frames"])
+        
+    def get_decoder_pool_size(self):
+        """获取保持打开的解码器数"""
+        return self.config.get("decoder_pool_size", self.DEFAULT_CONFIG["decoder_pool_size"])
+        
+    def get_suggested_frames(self):
+        """获取候选关键帧数"""
+        return self.config.get("suggested_frames", self.DEFAULT_CONFIG["suggested_frames"])
+        
+    def get_snap_mode(self):
+        """获取发送帧时的清晰帧查找方式（off / suggest / auto）"""
+        return self.config.get("snap_mode", self.DEFAULT_CONFIG["snap_mode"])
+        
+    def get_snap_radius(self):
+        """获取查找清晰帧的前后帧数"""
+        return self.config.get("snap_radius", self.DEFAULT_CONFIG["snap_radius"])
+        
+    def get_output_format(self, output_dir):
+        """获取输出目录（Annotation / Reference）的图像格式配置"""
+        output_format = dict(self.DEFAULT_CONFIG["output_formats"].get(output_dir, {}))
+        output_format.update(self.config.get("output_formats", {}).get(output_dir, {}))
+        return output_format
+        
+    def get_reference_mode(self):
+        """获取参考图保存方式（file / overlay）"""
+        return self.config.get("reference_mode", self.DEFAULT_CONFIG["reference_mode"])
+        
     def get_last_video_dir(self):
         """获取上次的视频目录"""
         return self.config.get("last_video_dir", "./video")
@@ -69,61 +235,130 @@ class ConfigManager:
 class AnnotationManager:
     """标注数据管理器"""
     
-    ANNOTATIONS_FILE = "saved_images/annotations.json"
+    ANNOTATIONS_FILE = "saved_images/annotations.jsonl"
+    LEGACY_ANNOTATIONS_FILE = "saved_images/annotations.json"  # 旧版整体重写的JSON，首次启动时迁移
     ANNOTATION_DIR = "saved_images/Annotation"
     REFERENCE_DIR = "saved_images/Reference"
     
-    def __init__(self):
+    def __init__(self, config_manager=None):
+        self.config_manager = config_manager
+        
         # 确保目录存在
         os.makedirs(self.ANNOTATION_DIR, exist_ok=True)
         os.makedirs(self.REFERENCE_DIR, exist_ok=True)
         
+        # 元数据只在启动时读取一次，之后每次保存只追加一行
+        self.store = AnnotationStore(self.ANNOTATIONS_FILE, self.LEGACY_ANNOTATIONS_FILE)
+        
+        # 两张图并行编码（cv2编码时释放GIL）
+        self.encoder_pool = ThreadPoolExecutor(max_workers=2)
+        
+        # 最近一次保存各步骤的耗时(毫秒)
+        self.last_save_times = {}
+        
+    def get_output_format(self, output_dir):
+        """获取输出目录的图像格式配置"""
+        name = os.path.basename(output_dir)
+        if self.config_manager is not None:
+            return self.config_manager.get_output_format(name)
+        return ConfigManager.DEFAULT_CONFIG["output_formats"].get(name, {"format": "png"})
+        
+    def get_reference_format(self):
+        """获取参考图的 (扩展名, cv2.imwrite参数)"""
+        return get_imwrite_params(self.get_output_format(self.REFERENCE_DIR))
+        
+    def stores_reference(self):
+        """是否保存参考图文件（overlay模式下只保存标记点元数据）"""
+        if self.config_manager is None:
+            return True
+        return self.config_manager.get_reference_mode() != "overlay"
+        
+    def find_image(self, output_dir, image_id):
+        """查找已保存的图像（任意支持的格式），不存在返回None"""
+        for ext in IMAGE_FORMATS.values():
+            path = os.path.join(output_dir, f"{image_id}{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+        
+    def write_image(self, output_dir, image_id, image):
+        """按目录的格式配置编码并写入图像，返回 (文件路径, 耗时毫秒)"""
+        start = time.perf_counter()
+        path = write_image_file(output_dir, image_id, image, self.get_output_format(output_dir))
+        return path, (time.perf_counter() - start) * 1000
+        
     def load_annotations(self):
         """加载所有标注元数据"""
-        if os.path.exists(self.ANNOTATIONS_FILE):
-            try:
-                with open(self.ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"加载标注数据失败: {e}")
-        return {}
+        return self.store.get_all()
+        
+    def get_annotation(self, image_id):
+        """获取单个标注的元数据，不存在返回None"""
+        return self.store.get(image_id)
+        
+    def find_annotations(self, source_video, frame_number=None):
+        """按来源视频（和帧号）查找标注 {图像ID: 元数据}"""
+        if frame_number is None:
+            return self.store.find_by_video(source_video)
+        return self.store.find_by_frame(source_video, frame_number)
+        
+    def get_video_stats(self, source_video=None):
+        """视频的标注汇总（标注数、最后标注的帧、保留/去除点总数）；不指定视频时返回全部 {标注键(文件名): 汇总}"""
+        return self.store.get_video_stats(source_video)
+        
+    def add_listener(self, listener):
+        """注册标注变更监听者 listener(操作, 图像ID, 元数据)，可能在保存线程中被调用"""
+        self.store.add_listener(listener)
+        
+    def remove_listener(self, listener):
+        """注销标注变更监听者"""
+        self.store.remove_listener(listener)
         
     def save_annotations(self, annotations):
         """保存所有标注元数据"""
         try:
-            with open(self.ANNOTATIONS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(annotations, f, ensure_ascii=False, indent=2)
+            self.store.replace_all(annotations)
         except Exception as e:
             print(f"保存标注数据失败: {e}")
             
     def save_annotation(self, data):
         """保存单个标注"""
         try:
+            start = time.perf_counter()
             image_id = data["image_id"]
             
-            # 保存原始ROI图像（无标记）
-            ann_path = os.path.join(self.ANNOTATION_DIR, f"{image_id}.png")
-            cv2.imwrite(ann_path, data["roi_image"])
+            # 并行保存原始ROI图像（无标记）和带标记的ROI图像
+            ann_future = self.encoder_pool.submit(
+                self.write_image, self.ANNOTATION_DIR, image_id, data["roi_image"]
+            )
+            ref_image = data.get("roi_image_with_points")
+            if self.stores_reference() and ref_image is not None:
+                ref_future = self.encoder_pool.submit(
+                    self.write_image, self.REFERENCE_DIR, image_id, ref_image
+                )
+            else:
+                # overlay模式: 参考图由标记点现场绘制，删除以前保存的参考图文件
+                ref_future = None
+                old_ref_path = self.find_image(self.REFERENCE_DIR, image_id)
+                if old_ref_path:
+                    os.remove(old_ref_path)
+            ann_path, ann_ms = ann_future.result()
+            ref_path, ref_ms = ref_future.result() if ref_future else (None, 0.0)
             
-            # 保存带标记的ROI图像
-            ref_path = os.path.join(self.REFERENCE_DIR, f"{image_id}.png")
-            cv2.imwrite(ref_path, data["roi_image_with_points"])
+            # 更新元数据（追加到日志）
+            metadata_start = time.perf_counter()
+            self.store.put(image_id, self.build_metadata(data, ann_path, ref_path))
             
-            # 更新元数据
-            annotations = self.load_annotations()
-            annotations[image_id] = {
-                "source_video": data["source_video"],
-                "frame_number": data["frame_number"],
-                "roi_coords": data["roi_coords"],
-                "comment": data["comment"],
-                "points": data["points"],
-                "remove_count": sum(1 for p in data["points"] if p["type"] == "remove"),
-                "keep_count": sum(1 for p in data["points"] if p["type"] == "keep"),
-                "created_at": datetime.now().isoformat()
+            end = time.perf_counter()
+            self.last_save_times = {
+                "annotation_ms": ann_ms,
+                "reference_ms": ref_ms,
+                "metadata_ms": (end - metadata_start) * 1000,
+                "total_ms": (end - start) * 1000
             }
-            self.save_annotations(annotations)
-            
-            print(f"已保存: {image_id}")
+            print(
+                f"已保存: {image_id} (Annotation {ann_ms:.0f}ms, "
+                f"Reference {ref_ms:.0f}ms, 共 {self.last_save_times['total_ms']:.0f}ms)"
+            )
             return True
             
         except Exception as e:
@@ -132,13 +367,37 @@ class AnnotationManager:
             traceback.print_exc()
             return False
             
+    @classmethod
+    def build_metadata(cls, data, ann_path, ref_path):
+        """由保存数据和已写入的图像路径构建标注元数据"""
+        return {
+            "source_video": data["source_video"],
+            "frame_number": data["frame_number"],
+            # 帧的显示时间戳(ms)，可变帧率视频中按它可以精确找回同一帧
+            "pts_ms": round(data["pts_ms"], 3) if data.get("pts_ms") is not None else None,
+            "roi_coords": data["roi_coords"],
+            "comment": data["comment"],
+            "points": data["points"],
+            "remove_count": sum(1 for p in data["points"] if p["type"] == "remove"),
+            "keep_count": sum(1 for p in data["points"] if p["type"] == "keep"),
+            "annotation_file": os.path.basename(ann_path),
+            "reference_file": os.path.basename(ref_path) if ref_path else None,
+            "created_at": datetime.now().isoformat()
+        }
+        
+    def put_annotation(self, image_id, metadata):
+        """直接写入已构建好的标注元数据（图像文件已由调用方写好）"""
+        try:
+            self.store.put(image_id, metadata)
+            return True
+        except Exception as e:
+            print(f"保存标注数据失败: {e}")
+            return False
+            
     def delete_annotation(self, image_id):
         """删除标注"""
         try:
-            annotations = self.load_annotations()
-            if image_id in annotations:
-                del annotations[image_id]
-                self.save_annotations(annotations)
+            self.store.delete(image_id)
             return True
         except Exception as e:
             print(f"删除标注失败: {e}")
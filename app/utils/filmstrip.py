@@ -0,0 +1,155 @@
+"""
+胶片条 - 按固定间隔取样的小缩略图，每个视频一个内存映射的精灵图文件
+"""
+import os
+import json
+import math
+import bisect
+import cv2
+import numpy as np
+
+from .file_utils import get_video_cache_path
+from .frame_decoder import FrameDecoder
+
+
+class Filmstrip:
+    """视频胶片条
+
+    所有缩略图保存在一个 (N, H, W, 3) 的 .npy 精灵图中，以内存映射方式读取，
+    不占用解码器，也不需要把整个文件读入内存。旁边的 .json 记录每张缩略图对应的帧号，
+    生成完成后才写入，因此没有 .json 的精灵图视为未完成。
+    取样位置优先使用不晚于目标帧的关键帧，每张缩略图只需解码一帧；
+    关键帧过于稀疏时才顺序解码到目标帧。
+    """
+    
+    VERSION = 1
+    THUMB_HEIGHT = 90           # 缩略图高度，宽度按视频宽高比
+    MAX_THUMBS = 240            # 每个视频最多的缩略图数
+    
+    def __init__(self, sprite, frames, count=None):
+        self.sprite = sprite                # (N, H, W, 3) uint8，通常是内存映射
+        self.frames = list(frames)          # 每张缩略图对应的帧号（升序）
+        self.count = len(self.frames) if count is None else count   # 已生成的缩略图数
+        
+    @property
+    def thumb_size(self):
+        """缩略图尺寸 (宽, 高)"""
+        return self.sprite.shape[2], self.sprite.shape[1]
+        
+    def thumbnail(self, frame_number):
+        """不晚于指定帧的最近一张已生成的缩略图（BGR ndarray），还没有时返回None"""
+        if not self.count:
+            return None
+        i = bisect.bisect_right(self.frames, frame_number, 0, self.count) - 1
+        return self.sprite[max(i, 0)]
+        
+    @classmethod
+    def cache_paths(cls, video_path):
+        """精灵图和帧号表的缓存路径"""
+        return (
+            get_video_cache_path(video_path, "filmstrip", ".npy"),
+            get_video_cache_path(video_path, "filmstrip", ".json")
+        )
+        
+    @classmethod
+    def load(cls, video_path):
+        """读取已生成完成的胶片条（内存映射），没有时返回None"""
+        try:
+            sprite_path, meta_path = cls.cache_paths(video_path)
+        except OSError:
+            return None
+        if not os.path.exists(sprite_path) or not os.path.exists(meta_path):
+            return None
+            
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") != cls.VERSION:
+                return None
+            sprite = np.load(sprite_path, mmap_mode='r')
+            if len(sprite) != len(meta["frames"]):
+                return None
+            return cls(sprite, meta["frames"])
+        except Exception as e:
+            print(f"加载胶片条失败: {e}")
+            return None
+            
+    @classmethod
+    def sample_frames(cls, frame_count, index=None):
+        """取样帧号: 每隔固定间隔取一帧，间隔内有关键帧时改用该关键帧"""
+        interval = max(1, math.ceil(frame_count / cls.MAX_THUMBS))
+        frames = []
+        for target in range(0, frame_count, interval):
+            if index is not None:
+                keyframe = index.keyframe_before(target)
+                if target - keyframe < interval:
+                    target = keyframe
+            if not frames or target > frames[-1]:
+                frames.append(target)
+        return frames
+        
+    @classmethod
+    def load_or_generate(cls, video_path, on_start=None, progress=None, is_cancelled=None):
+        """优先读取缓存，没有则生成；取消或失败时返回None"""
+        filmstrip = cls.load(video_path)
+        if filmstrip is not None:
+            return filmstrip
+        return cls.generate(video_path, on_start, progress, is_cancelled)
+        
+    @classmethod
+    def generate(cls, video_path, on_start=None, progress=None, is_cancelled=None):
+        """用独立的解码器生成胶片条
+
+        on_start(胶片条) 在精灵图创建后调用，生成过程中即可使用已完成的部分；
+        progress(已生成数, 总数) 每张调用一次；is_cancelled() 返回True时中止并返回None。
+        """
+        try:
+            sprite_path, meta_path = cls.cache_paths(video_path)
+        except OSError as e:
+            print(f"获取胶片条缓存路径失败: {e}")
+            return None
+            
+        decoder = FrameDecoder(video_path)
+        if not decoder.open():
+            return None
+            
+        try:
+            frames = cls.sample_frames(decoder.frame_count, decoder.index)
+            first = decoder.read(frames[0]) if frames else None
+            if first is None:
+                return None
+                
+            h, w = first.shape[:2]
+            thumb_h = min(h, cls.THUMB_HEIGHT)
+            size = (max(1, round(w * thumb_h / h)), thumb_h)
+            sprite = np.lib.format.open_memmap(
+                sprite_path, mode='w+', dtype=np.uint8, shape=(len(frames), size[1], size[0], 3)
+            )
+            filmstrip = cls(sprite, frames, count=0)
+            if on_start is not None:
+                on_start(filmstrip)
+                
+            for i, frame_number in enumerate(frames):
+                frame = first if i == 0 else decoder.read(frame_number)
+                if frame is not None:
+                    sprite[i] = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                elif i > 0:
+                    # 解码失败时沿用前一张
+                    sprite[i] = sprite[i - 1]
+                filmstrip.count = i + 1
+                
+                if progress is not None:
+                    progress(i + 1, len(frames))
+                if is_cancelled is not None and is_cancelled():
+                    return None
+                    
+            sprite.flush()
+            with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump({"version": cls.VERSION, "frames": frames}, f)
+            os.replace(meta_path + ".tmp", meta_path)
+            return filmstrip
+        except Exception as e:
+            print(f"生成胶片条失败: {e}")
+            return None
+        finally:
+            decoder.release()
@@ -0,0 +1,66 @@
+"""
+共享帧缓冲 - 解码帧在播放器、缓存和标注画布之间只读共享，写入时才复制
+"""
+import numpy as np
+
+
+class FrameBuffer:
+    """只读共享的帧缓冲（写时复制）
+
+    包装OpenCV的BGR帧并将其设为只读，各使用方共享同一块内存；
+    需要修改时调用 writable_copy() 得到独立副本。
+    显示时通过 to_qimage() 以 Format_BGR888 直接引用这块内存，无需颜色转换。
+    """
+    
+    def __init__(self, array):
+        if isinstance(array, FrameBuffer):
+            array = array.array
+        if array.ndim == 3 and array.strides[1] != array.shape[2]:
+            array = np.ascontiguousarray(array)
+        if array.flags.writeable:
+            array.flags.writeable = False
+        self.array = array
+        
+    @classmethod
+    def wrap(cls, frame):
+        """已是FrameBuffer时原样返回，否则包装ndarray"""
+        if frame is None or isinstance(frame, FrameBuffer):
+            return frame
+        return cls(frame)
+        
+    @property
+    def shape(self):
+        return self.array.shape
+        
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+        
+    def writable_copy(self):
+        """获取可写副本"""
+        return self.array.copy()
+        
+    def region(self, x, y, w, h):
+        """截取区域的只读视图（不复制）"""
+        return FrameBuffer(self.array[y:y + h, x:x + w])
+        
+    def to_qimage(self):
+        """以 Format_BGR888 引用缓冲内存构造QImage（不复制、不转换颜色）
+
+        返回的QImage不拥有数据，使用期间必须保持本对象存活；
+        需要长期保存时用 QPixmap.fromImage() 或 QImage.copy()。
+        """
+        from PyQt6.QtGui import QImage
+        from PyQt6 import sip
+        
+        array = self.array
+        h, w = array.shape[:2]
+        if array.ndim == 2:
+            return QImage(
+                sip.voidptr(array.ctypes.data), w, h, array.strides[0],
+                QImage.Format.Format_Grayscale8
+            )
+        return QImage(
+            sip.voidptr(array.ctypes.data), w, h, array.strides[0],
+            QImage.Format.Format_BGR888
+        )
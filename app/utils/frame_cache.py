@@ -0,0 +1,96 @@
+"""
+解码帧缓存 - 按字节预算淘汰的LRU缓存
+"""
+import threading
+from collections import OrderedDict
+
+
+class FrameCache:
+    """解码帧LRU缓存
+
+    以 (视频路径, 帧号) 为键，总字节数超过预算时淘汰最久未使用的帧。
+    播放器（界面线程）和解码线程共同访问，内部加锁。
+    """
+    
+    def __init__(self, max_mb=512):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.current_bytes = 0
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+        
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, video_path, frame_number, count=True):
+        """获取缓存帧，未命中返回None；count=False时不计入命中统计"""
+        key = (video_path, frame_number)
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is None:
+                if count:
+                    self.misses += 1
+                return None
+            self.frames.move_to_end(key)
+            if count:
+                self.hits += 1
+            return frame
+            
+    def contains(self, video_path, frame_number):
+        """是否已缓存（不计入统计，不影响淘汰顺序）"""
+        with self.lock:
+            return (video_path, frame_number) in self.frames
+            
+    def put(self, video_path, frame_number, frame):
+        """放入缓存"""
+        if frame is None or frame.nbytes > self.max_bytes:
+            return
+            
+        key = (video_path, frame_number)
+        with self.lock:
+            old = self.frames.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.nbytes
+                
+            self.frames[key] = frame
+            self.current_bytes += frame.nbytes
+            self.evict()
+            
+    def evict(self):
+        """淘汰超出预算的帧（调用方持有锁）"""
+        while self.current_bytes > self.max_bytes and self.frames:
+            _, frame = self.frames.popitem(last=False)
+            self.current_bytes -= frame.nbytes
+            self.evictions += 1
+            
+    def set_budget(self, max_mb):
+        """调整内存预算(MB)"""
+        with self.lock:
+            self.max_bytes = int(max_mb * 1024 * 1024)
+            self.evict()
+            
+    def clear(self, video_path=None):
+        """清空缓存；指定视频时只清除该视频的帧（键前缀为元组时按其第一项匹配，如显示缓存）"""
+        with self.lock:
+            if video_path is None:
+                self.frames.clear()
+                self.current_bytes = 0
+                return
+            for key in [k for k in self.frames
+                        if k[0] == video_path or (isinstance(k[0], tuple) and k[0][0] == video_path)]:
+                self.current_bytes -= self.frames.pop(key).nbytes
+                
+    def get_stats(self):
+        """获取缓存统计"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "frames": len(self.frames),
+                "used_mb": self.current_bytes / (1024 * 1024),
+                "budget_mb": self.max_bytes / (1024 * 1024)
+            }
@@ -0,0 +1,177 @@
+"""
+帧解码器 - 基于关键帧索引的随机访问解码
+"""
+import cv2
+
+from .video_index import SeekIndex
+
+
+class FrameDecoder:
+    """带关键帧索引的帧解码器
+
+    跳转时先定位到目标之前最近的关键帧，再向前顺序解码到目标帧；
+    目标就在当前位置之后且无需跨越关键帧时，直接复用已打开的解码器。
+    定位按索引中的显示时间戳进行，并用解码器实际解码到的帧的时间戳核对位置，
+    可变帧率视频中帧号与画面同样一一对应。
+    """
+    
+    # 跨越关键帧时，距离不超过该帧数仍继续顺序解码而不重新定位
+    FORWARD_DECODE_LIMIT = 8
+    # 没有索引时，顺序解码可以追赶的最大帧数
+    FALLBACK_DECODE_LIMIT = 30
+    # 按时间戳定位落在目标之后时，退到更早的关键帧重试的次数（之后从头解码）
+    SEEK_RETRIES = 3
+    
+    def __init__(self, video_path, seek_index=None):
+        self.video_path = video_path
+        self.index = seek_index
+        self.cap = None
+        self.position = 0       # 下一次 read_next 将输出的帧号
+        self.frame_count = 0
+        self.fps = 30
+        
+    def open(self, build_index=True):
+        """打开视频，必要时建立索引"""
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            self.cap = None
+            return False
+            
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.position = 0
+        
+        if self.index is None and build_index:
+            self.index = SeekIndex.load_or_build(self.video_path)
+        if self.index is not None:
+            self.frame_count = self.index.frame_count
+        return True
+        
+    def release(self):
+        """释放解码器"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+            
+    def is_open(self):
+        return self.cap is not None
+        
+    def read_next(self):
+        """顺序解码下一帧，返回 (帧号, 帧)，结束时帧为None"""
+        ret, frame = self.cap.read()
+        frame_number = self.position
+        if not ret:
+            return frame_number, None
+        self.position += 1
+        return frame_number, frame
+        
+    def read(self, frame_number, is_cancelled=None):
+        """解码指定帧
+
+        is_cancelled() 在向前逐帧解码时检查，返回True时放弃并返回None（解码位置保持有效）。
+        """
+        if self.cap is None:
+            return None
+            
+        if not self.can_decode_forward(frame_number):
+            self.seek(frame_number)
+            
+        # 向前顺序解码（只grab不转换）到目标帧
+        while self.position < frame_number:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            if not self.cap.grab():
+                return None
+            self.position += 1
+            
+        return self.read_next()[1]
+        
+    def read_keyframe(self, frame_number):
+        """只解码不晚于目标帧的最近关键帧（快速预览），返回 (关键帧号, 帧)
+
+        没有索引时无法定位关键帧，退化为解码目标帧本身。
+        """
+        if self.cap is None:
+            return frame_number, None
+        if self.index is None:
+            return frame_number, self.read(frame_number)
+            
+        keyframe = self.index.keyframe_before(frame_number)
+        if self.position != keyframe:
+            self.seek(keyframe)
+        return self.read_next()
+        
+    def read_range(self, start, end, is_cancelled=None):
+        """依次解码 [start, end] 区间的帧，生成 (帧号, 帧)；is_cancelled() 为True时提前结束"""
+        frame = self.read(start, is_cancelled)
+        frame_number = start
+        while frame is not None:
+            yield frame_number, frame
+            if frame_number >= end:
+                break
+            if is_cancelled is not None and is_cancelled():
+                break
+            frame_number, frame = self.read_next()
+            
+    def can_decode_forward(self, frame_number):
+        """目标帧是否可以从当前位置顺序解码到达"""
+        distance = frame_number - self.position
+        if distance < 0:
+            return False
+        if self.index is None:
+            return distance <= self.FALLBACK_DECODE_LIMIT
+            
+        # 目标与当前位置处于同一GOP，或者距离很近
+        if frame_number < self.index.keyframe_after(self.position):
+            return True
+        return distance <= self.FORWARD_DECODE_LIMIT
+        
+    def frame_time(self, frame_number):
+        """帧的显示时间戳(ms)"""
+        if self.index is not None:
+            return self.index.time_of_frame(frame_number)
+        return frame_number * 1000 / self.fps
+        
+    def seek(self, frame_number):
+        """定位到目标帧之前（不晚于目标帧）的位置
+
+        OpenCV 按平均帧率换算帧号，可变帧率视频中按帧号定位会落到别的帧上。有时间戳表时
+        按目标之前最近关键帧的显示时间戳定位，再由实际落点确定位置；落点晚于目标时
+        退到更早的关键帧重试，仍不行时回到视频开头（开头总是准确的）。
+        """
+        if self.index is None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            self.position = frame_number
+            return
+            
+        keyframe = self.index.keyframe_before(frame_number)
+        if self.index.timestamps:
+            for _ in range(self.SEEK_RETRIES):
+                if keyframe == 0:
+                    break
+                position = self.seek_to_time(self.index.time_of_frame(keyframe))
+                if position is None:
+                    break   # 时间戳与索引对不上，按帧号定位
+                if position <= frame_number:
+                    self.position = position
+                    return
+                keyframe = self.index.keyframe_before(keyframe - 1)
+            else:
+                keyframe = 0
+                
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        self.position = keyframe
+        
+    def seek_to_time(self, msec):
+        """按显示时间戳定位，返回实际的解码位置（下一次 read_next 输出的帧号）
+
+        定位后解码器停在落点的前一帧上，它的时间戳在表中对应的帧号加一即为当前位置。
+        报告的时间戳不在表中时返回None。
+        """
+        self.cap.set(cv2.CAP_PROP_POS_MSEC, msec)
+        if msec * self.fps < 500:
+            return 0    # 换算为第0帧，解码器停在开头，尚未解码任何帧
+        landed = self.index.frame_at_pts(self.cap.get(cv2.CAP_PROP_POS_MSEC))
+        if landed is None:
+            return None
+        return landed + 1
@@ -0,0 +1,212 @@
+"""
+帧评分 - 帧差、直方图距离和清晰度，用于推荐关键操作瞬间，缓存到旁路文件
+"""
+import os
+import cv2
+import numpy as np
+
+from .file_utils import get_video_cache_path
+from .frame_buffer import FrameBuffer
+
+
+def laplacian_variance(stack):
+    """一组灰度图 (N, H, W) 的拉普拉斯方差（越大越清晰），整组向量化计算"""
+    stack = stack.astype(np.float32)
+    lap = (
+        4 * stack[:, 1:-1, 1:-1]
+        - stack[:, :-2, 1:-1] - stack[:, 2:, 1:-1]
+        - stack[:, 1:-1, :-2] - stack[:, 1:-1, 2:]
+    )
+    return lap.reshape(len(stack), -1).var(axis=1)
+
+
+def frame_sharpness(frames, width=320):
+    """一组同尺寸帧的清晰度: 缩小到同一宽度的灰度图后整组计算拉普拉斯方差"""
+    arrays = [frame.array if isinstance(frame, FrameBuffer) else frame for frame in frames]
+    h, w = arrays[0].shape[:2]
+    width = min(w, width)
+    size = (width, max(3, round(h * width / w)))
+    stack = np.stack([
+        cv2.cvtColor(cv2.resize(array, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        for array in arrays
+    ])
+    return laplacian_variance(stack)
+
+
+def gray_histograms(stack, bins):
+    """一组灰度图 (N, H, W) 的归一化直方图 (N, bins)，用一次bincount完成"""
+    n = len(stack)
+    quantized = (stack.reshape(n, -1) // (256 // bins)).astype(np.intp)
+    quantized += np.arange(n, dtype=np.intp)[:, None] * bins
+    counts = np.bincount(quantized.ravel(), minlength=n * bins).reshape(n, bins)
+    return counts / float(stack[0].size)
+
+
+def normalize_scores(values):
+    """按99分位数缩放到 0~1，避免个别极端值压扁其余分数"""
+    scale = np.percentile(values, 99) if len(values) else 0
+    if scale <= 0:
+        return np.zeros_like(values)
+    return np.clip(values / scale, 0, 1)
+
+
+class FrameScores:
+    """逐帧评分
+
+    在缩小的灰度帧上计算三项分数，按块（CHUNK_SIZE帧）整体向量化：
+    - diff: 与前一帧的平均绝对差（运动）
+    - hist: 与前一帧的灰度直方图距离（0~1，镜头/场景变化）
+    - sharpness: 拉普拉斯方差（模糊帧较小）
+    运动和场景变化归一化后相加，再按清晰度降低模糊帧的权重，
+    取局部最高的若干帧作为候选关键帧。
+    """
+    
+    VERSION = 1
+    ANALYSIS_WIDTH = 160        # 分析用的缩小宽度
+    CHUNK_SIZE = 64             # 每块帧数
+    HIST_BINS = 32
+    
+    def __init__(self, diff, hist, sharpness, fps=30.0):
+        self.diff = np.asarray(diff, dtype=np.float32)
+        self.hist = np.asarray(hist, dtype=np.float32)
+        self.sharpness = np.asarray(sharpness, dtype=np.float32)
+        self.fps = fps
+        
+    @property
+    def frame_count(self):
+        return len(self.diff)
+        
+    @classmethod
+    def load_or_compute(cls, video_path, progress=None, is_cancelled=None):
+        """优先读取缓存，没有则分析视频并写入缓存；取消或失败时返回None"""
+        try:
+            cache_path = get_video_cache_path(video_path, "scores", ".npz")
+        except OSError:
+            return cls.compute(video_path, progress, is_cancelled)
+            
+        scores = cls.load(cache_path)
+        if scores is None:
+            scores = cls.compute(video_path, progress, is_cancelled)
+            if scores is not None:
+                scores.save(cache_path)
+        return scores
+        
+    @classmethod
+    def compute(cls, video_path, progress=None, is_cancelled=None):
+        """顺序解码整个视频计算逐帧分数
+
+        progress(已分析帧数, 总帧数) 每块报告一次；is_cancelled() 返回True时中止并返回None。
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return None
+            
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        size = None
+        diffs, hists, sharpness = [], [], []
+        prev_frame = prev_hist = None
+        chunk = []
+        
+        try:
+            while True:
+                ok = cap.grab()
+                if ok:
+                    ok, frame = cap.retrieve()
+                if ok:
+                    if size is None:
+                        h, w = frame.shape[:2]
+                        width = min(w, cls.ANALYSIS_WIDTH)
+                        size = (width, max(3, round(h * width / w)))
+                    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                    chunk.append(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+                    
+                if len(chunk) == cls.CHUNK_SIZE or (not ok and chunk):
+                    stack = np.stack(chunk)
+                    chunk = []
+                    prev_frame, prev_hist = cls.score_chunk(
+                        stack, prev_frame, prev_hist, diffs, hists, sharpness
+                    )
+                    if progress is not None:
+                        progress(sum(len(d) for d in diffs), max(total, 1))
+                    if is_cancelled is not None and is_cancelled():
+                        return None
+                        
+                if not ok:
+                    break
+        finally:
+            cap.release()
+            
+        if not diffs:
+            return None
+        return cls(np.concatenate(diffs), np.concatenate(hists), np.concatenate(sharpness), fps)
+        
+    @classmethod
+    def score_chunk(cls, stack, prev_frame, prev_hist, diffs, hists, sharpness):
+        """计算一块帧的分数并追加到结果列表，返回该块最后一帧及其直方图"""
+        frames = stack.astype(np.int16)
+        frame_hists = gray_histograms(stack, cls.HIST_BINS)
+        
+        # 与前一帧比较；整个视频的第一帧与自身比较，分数为0
+        previous = frames[:1] if prev_frame is None else prev_frame[None]
+        previous_hists = frame_hists[:1] if prev_hist is None else prev_hist[None]
+        frames_before = np.concatenate([previous, frames[:-1]])
+        hists_before = np.concatenate([previous_hists, frame_hists[:-1]])
+        
+        diffs.append(np.abs(frames - frames_before).mean(axis=(1, 2)))
+        hists.append(0.5 * np.abs(frame_hists - hists_before).sum(axis=1))
+        sharpness.append(laplacian_variance(stack))
+        return frames[-1], frame_hists[-1]
+        
+    @classmethod
+    def load(cls, path):
+        """从缓存文件加载"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != cls.VERSION:
+                    return None
+                return cls(data["diff"], data["hist"], data["sharpness"], float(data["fps"]))
+        except Exception as e:
+            print(f"加载帧评分失败: {e}")
+            return None
+            
+    def save(self, path):
+        """保存到缓存文件（写完后原子替换）"""
+        try:
+            temp_path = path + ".tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(
+                    f, version=self.VERSION, fps=self.fps,
+                    diff=self.diff, hist=self.hist, sharpness=self.sharpness
+                )
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"保存帧评分失败: {e}")
+            
+    def combined(self):
+        """综合分数: 运动 + 场景变化，按相对清晰度降低模糊帧的权重"""
+        motion = normalize_scores(self.diff) + normalize_scores(self.hist)
+        median = float(np.median(self.sharpness)) if self.frame_count else 0.0
+        if median <= 0:
+            return motion
+        return motion * np.clip(self.sharpness / median, 0, 1)
+        
+    def top_frames(self, k, min_gap=None):
+        """综合分数最高的 k 帧（升序帧号），相邻候选至少相隔 min_gap 帧（默认1秒）"""
+        if min_gap is None:
+            min_gap = int(round(self.fps))
+        score = self.combined()
+        taken = np.zeros(len(score), dtype=bool)
+        chosen = []
+        
+        for frame_number in np.argsort(score)[::-1]:
+            if len(chosen) >= k or score[frame_number] <= 0:
+                break
+            if taken[frame_number]:
+                continue
+            chosen.append(int(frame_number))
+            taken[max(0, frame_number - min_gap):frame_number + min_gap + 1] = True
+            
+        return sorted(chosen)
@@ -0,0 +1,51 @@
+"""
+图像金字塔 - 按需构建的多分辨率图层，供标注画布按图块缩放显示
+"""
+import cv2
+
+from .frame_buffer import FrameBuffer
+
+
+class ImagePyramid:
+    """按需构建的图像金字塔
+
+    第0层为原图，第L层由第L-1层经 cv2.pyrDown 得到（宽高各约减半）。
+    只有实际用到的层级才会构建；各层以只读FrameBuffer保存，
+    图块是层级图像的视图，不复制数据。
+    """
+    
+    # 最粗层级的长边不小于该像素数
+    MIN_SIZE = 64
+    
+    def __init__(self, frame):
+        self.levels = [FrameBuffer.wrap(frame)]
+        
+    @property
+    def size(self):
+        """原图尺寸 (宽, 高)"""
+        h, w = self.levels[0].shape[:2]
+        return w, h
+        
+    def level_for_scale(self, scale):
+        """显示比例为 scale 时使用的层级（分辨率不低于屏幕的最粗层级）"""
+        w, h = self.size
+        level = 0
+        while scale * 2 ** (level + 1) <= 1.0 and max(w, h) >> (level + 1) >= self.MIN_SIZE:
+            level += 1
+        return level
+        
+    def level(self, level):
+        """获取指定层级的图像，未构建时逐层构建"""
+        while len(self.levels) <= level:
+            self.levels.append(FrameBuffer(cv2.pyrDown(self.levels[-1].array)))
+        return self.levels[level]
+        
+    def level_factor(self, level):
+        """层级像素对应的原图像素数 (x方向, y方向)"""
+        w, h = self.size
+        level_h, level_w = self.level(level).shape[:2]
+        return w / level_w, h / level_h
+        
+    def tile(self, level, tx, ty, tile_size):
+        """截取层级图像中第 (tx, ty) 个图块（边缘图块可能小于 tile_size）"""
+        return self.level(level).region(tx * tile_size, ty * tile_size, tile_size, tile_size)
@@ -0,0 +1,119 @@
+"""
+参考图渲染 - 由Annotation图像和标记点元数据按需绘制参考图
+"""
+import os
+import json
+import cv2
+
+from .file_utils import AnnotationManager, get_video_cache_path, prune_cache_dir
+
+
+def draw_points(roi_image, points):
+    """在ROI图像副本上绘制标记点（points为相对ROI的元数据列表）"""
+    image = roi_image.copy()
+    
+    for point in points:
+        px, py = point["pos"]
+        
+        if point["type"] == "remove":
+            # 红点 - 疏除
+            color = (68, 68, 255)  # BGR: 红色
+            label = "X"
+        else:
+            # 绿点 - 保留
+            color = (68, 255, 68)  # BGR: 绿色
+            label = "O"
+            
+        # 绘制圆点
+        cv2.circle(image, (px, py), 10, color, -1)
+        cv2.circle(image, (px, py), 10, (0, 0, 0), 2)
+        
+        # 绘制标签文字
+        cv2.putText(
+            image, label,
+            (px - 6, py + 6),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5, (255, 255, 255), 2
+        )
+        
+    return image
+
+
+class ReferenceRenderer:
+    """参考图渲染器
+
+    参考图 = Annotation图像 + 标记点覆盖层。已保存参考图文件时直接读取；
+    否则按元数据现场绘制，结果写入磁盘缓存 .cache/reference，
+    缓存键包含Annotation文件的路径、大小、修改时间和标记点，任一变化即失效。
+    """
+    
+    CACHE_KIND = "reference"
+    CACHE_QUALITY = 90          # 缓存使用JPEG，质量足够预览
+    MAX_CACHE_FILES = 500       # 缓存文件数上限，超过时删除最旧的
+    
+    def __init__(self, annotation_manager):
+        self.annotation_manager = annotation_manager
+        
+    def render(self, image_id):
+        """获取参考图（BGR ndarray），无法生成时返回None"""
+        manager = self.annotation_manager
+        ref_path = manager.find_image(AnnotationManager.REFERENCE_DIR, image_id)
+        if ref_path:
+            return cv2.imread(ref_path)
+            
+        ann_path = manager.find_image(AnnotationManager.ANNOTATION_DIR, image_id)
+        data = manager.get_annotation(image_id)
+        if ann_path is None or data is None:
+            return None
+            
+        points = data.get("points", [])
+        try:
+            cache_path = get_video_cache_path(
+                ann_path, self.CACHE_KIND, ".jpg",
+                extra=json.dumps(points, sort_keys=True)
+            )
+        except OSError as e:
+            print(f"获取参考图缓存路径失败: {e}")
+            cache_path = None
+            
+        if cache_path and os.path.exists(cache_path):
+            image = cv2.imread(cache_path)
+            if image is not None:
+                return image
+                
+        roi_image = cv2.imread(ann_path)
+        if roi_image is None:
+            return None
+        image = draw_points(roi_image, points)
+        
+        if cache_path:
+            cv2.imwrite(cache_path, image, [cv2.IMWRITE_JPEG_QUALITY, self.CACHE_QUALITY])
+            self.prune_cache(os.path.dirname(cache_path))
+        return image
+        
+    def prune_cache(self, cache_dir):
+        """缓存文件过多时删除最旧的"""
+        prune_cache_dir(cache_dir, self.MAX_CACHE_FILES)
+        
+    def export(self, output_dir, progress=None):
+        """把所有标注的参考图导出到目录，返回导出数量
+
+        progress(已完成, 总数) 用于报告进度，返回False时中止。
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        ext, params = self.annotation_manager.get_reference_format()
+        image_ids = sorted(self.annotation_manager.load_annotations())
+        
+        exported = 0
+        for i, image_id in enumerate(image_ids):
+            if progress is not None and progress(i, len(image_ids)) is False:
+                break
+                
+            image = self.render(image_id)
+            if image is None:
+                print(f"导出参考图失败: {image_id}")
+                continue
+            cv2.imwrite(os.path.join(output_dir, f"{image_id}{ext}"), image, params)
+            exported += 1
+            
+        return exported
@@ -0,0 +1,71 @@
+"""
+搜索索引 - 在大量短文本（视频相对路径）中按子串快速过滤
+"""
+
+
+class SearchIndex:
+    """子串搜索索引
+
+    每条文本转为小写后按三字符组建立倒排表（编号升序）。查询按空白拆成多个词，每个词都要作为子串出现。
+    三个字符及以上的词取其最短的倒排表作为候选再逐条核对，候选通常只占很小一部分；
+    更短的词直接在已有候选（或全部文本）中核对。
+    """
+    
+    GRAM = 3
+    
+    def __init__(self):
+        self.texts = []         # 编号 -> 小写文本
+        self.grams = {}         # 三字符组 -> [编号, ...]
+        
+    def __len__(self):
+        return len(self.texts)
+        
+    def clear(self):
+        self.texts = []
+        self.grams = {}
+        
+    def add(self, text):
+        """加入一条文本，返回其编号（依次递增）"""
+        text = text.lower()
+        item_id = len(self.texts)
+        self.texts.append(text)
+        for gram in {text[i:i + self.GRAM] for i in range(len(text) - self.GRAM + 1)}:
+            postings = self.grams.get(gram)
+            if postings is None:
+                self.grams[gram] = [item_id]
+            else:
+                postings.append(item_id)
+        return item_id
+        
+    def candidates(self, term):
+        """term 的各三字符组中最短的倒排表（候选编号）；term 过短时返回None"""
+        if len(term) < self.GRAM:
+            return None
+        shortest = None
+        for i in range(len(term) - self.GRAM + 1):
+            postings = self.grams.get(term[i:i + self.GRAM])
+            if postings is None:
+                return []
+            if shortest is None or len(postings) < len(shortest):
+                shortest = postings
+        return shortest
+        
+    def search(self, query):
+        """返回匹配的编号（升序）；查询为空时返回None表示全部匹配"""
+        terms = query.lower().split()
+        if not terms:
+            return None
+            
+        # 先用最长的词缩小候选范围
+        terms.sort(key=len, reverse=True)
+        texts = self.texts
+        matches = None
+        for term in terms:
+            if matches is None:
+                matches = self.candidates(term)
+                if matches is None:
+                    matches = range(len(texts))
+            matches = [i for i in matches if term in texts[i]]
+            if not matches:
+                break
+        return matches
@@ -0,0 +1,137 @@
+"""
+缩略图缓存 - 降分辨率解码并持久化到磁盘的标注缩略图
+"""
+import os
+import json
+import struct
+import threading
+import cv2
+
+from .file_utils import AnnotationManager, get_video_cache_path, prune_cache_dir
+from .reference_renderer import ReferenceRenderer
+
+
+# 降分辨率解码的倍数 -> imread标志（JPEG可在解码时直接缩小）
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+def read_image_size(path):
+    """只读取文件头获取图像尺寸 (宽, 高)，支持PNG和JPEG，其他格式返回None"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(24)
+            if head[:8] == b'\x89PNG\r\n\x1a\n':
+                return struct.unpack('>II', head[16:24])
+                
+            if head[:2] != b'\xff\xd8':
+                return None
+                
+            # JPEG: 逐段查找SOF段
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                length = struct.unpack('>H', f.read(2))[0]
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack('>xHH', f.read(5))
+                    return w, h
+                f.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def read_reduced(path, size):
+    """以不小于 size 的最低分辨率解码图像"""
+    factor = 1
+    image_size = read_image_size(path)
+    if image_size:
+        while factor < 8 and max(image_size) // (factor * 2) >= size:
+            factor *= 2
+    return cv2.imread(path, REDUCED_FLAGS[factor])
+
+
+def fit_thumbnail(image, size):
+    """缩小到长边不超过 size"""
+    h, w = image.shape[:2]
+    scale = size / max(w, h)
+    if scale >= 1:
+        return image
+    return cv2.resize(
+        image, (max(1, int(w * scale)), max(1, int(h * scale))),
+        interpolation=cv2.INTER_AREA
+    )
+
+
+class ThumbnailCache:
+    """标注缩略图缓存
+
+    缩略图取自参考图：有参考图文件时降分辨率解码该文件；
+    overlay模式下由 ReferenceRenderer 按标记点绘制后缩小。
+    结果保存在 .cache/thumbnails，键为源文件路径、大小、修改时间
+    （overlay模式还包括标记点）和缩略图尺寸，源文件变化后自动失效。
+    失效的旧缩略图不单独清理：命中时刷新文件的修改时间，文件数超过上限时删除最久未用的。
+    可在多个工作线程中同时调用。
+    """
+    
+    CACHE_KIND = "thumbnails"
+    CACHE_QUALITY = 85
+    MAX_CACHE_FILES = 5000      # 缓存文件数上限（每个缩略图只有几KB）
+    PRUNE_INTERVAL = 100        # 首次写入及之后每写入这么多个缩略图检查一次上限
+    
+    def __init__(self, annotation_manager, size=150):
+        self.annotation_manager = annotation_manager
+        self.renderer = ReferenceRenderer(annotation_manager)
+        self.size = size
+        self.writes = 0
+        self.lock = threading.Lock()
+        
+    def load(self, image_id):
+        """获取缩略图（BGR ndarray），无法生成时返回None"""
+        manager = self.annotation_manager
+        ref_path = manager.find_image(AnnotationManager.REFERENCE_DIR, image_id)
+        source = ref_path
+        extra = f"{self.size}"
+        if ref_path is None:
+            source = manager.find_image(AnnotationManager.ANNOTATION_DIR, image_id)
+            data = manager.get_annotation(image_id) or {}
+            extra += "|" + json.dumps(data.get("points", []), sort_keys=True)
+        if source is None:
+            return None
+            
+        try:
+            cache_path = get_video_cache_path(source, self.CACHE_KIND, ".jpg", extra=extra)
+        except OSError as e:
+            print(f"获取缩略图缓存路径失败: {e}")
+            return None
+            
+        if os.path.exists(cache_path):
+            thumbnail = cv2.imread(cache_path)
+            if thumbnail is not None:
+                try:
+                    os.utime(cache_path)
+                except OSError:
+                    pass
+                return thumbnail
+                
+        if ref_path:
+            image = read_reduced(ref_path, self.size)
+        else:
+            image = self.renderer.render(image_id)
+        if image is None:
+            return None
+            
+        thumbnail = fit_thumbnail(image, self.size)
+        cv2.imwrite(cache_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, self.CACHE_QUALITY])
+        
+        with self.lock:
+            prune = self.writes % self.PRUNE_INTERVAL == 0
+            self.writes += 1
+        if prune:
+            prune_cache_dir(os.path.dirname(cache_path), self.MAX_CACHE_FILES)
+        return thumbnail
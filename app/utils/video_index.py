@@ -0,0 +1,153 @@
+"""
+视频索引 - 记录关键帧位置、帧时间戳和真实帧数，缓存到旁路文件
+
+帧号与时间的换算以逐帧时间戳表为准，可变帧率视频和容器帧数不准的文件同样准确。
+"""
+import os
+import json
+import bisect
+import cv2
+
+from .file_utils import get_video_cache_path
+
+
+class SeekIndex:
+    """视频随机访问索引"""
+    
+    VERSION = 1
+    
+    def __init__(self, frame_count=0, fps=30.0, keyframes=None, timestamps=None):
+        self.frame_count = frame_count          # 真实帧数（逐包统计）
+        self.fps = fps
+        self.keyframes = keyframes or [0]       # 关键帧帧号（升序）
+        self.timestamps = timestamps or []      # 每帧显示时间(ms)，按显示顺序
+        
+    @classmethod
+    def load_or_build(cls, video_path):
+        """优先读取缓存，没有则扫描视频并写入缓存"""
+        try:
+            cache_path = get_video_cache_path(video_path, "index", ".json")
+        except OSError:
+            return cls.build(video_path)
+            
+        index = cls.load(cache_path)
+        if index is None:
+            index = cls.build(video_path)
+            if index is not None:
+                index.save(cache_path)
+        return index
+        
+    @classmethod
+    def build(cls, video_path):
+        """扫描视频建立索引
+
+        以原始包模式（CAP_PROP_FORMAT=-1）打开视频，只解复用不解码，
+        逐包读取关键帧标记和时间戳。后端不支持时返回None。
+        """
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        if not cap.isOpened() or cap.get(cv2.CAP_PROP_FORMAT) != -1:
+            cap.release()
+            return None
+            
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        packet_times = []
+        keyframe_times = []
+        
+        while cap.grab():
+            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            packet_times.append(msec)
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframe_times.append(msec)
+        cap.release()
+        
+        if not packet_times:
+            return None
+            
+        # 包按解码顺序到达，按时间戳排序后即为显示顺序
+        timestamps = sorted(packet_times)
+        keyframes = sorted({bisect.bisect_left(timestamps, t) for t in keyframe_times})
+        if not keyframes or keyframes[0] != 0:
+            keyframes.insert(0, 0)
+            
+        return cls(len(timestamps), fps, keyframes, timestamps)
+        
+    @classmethod
+    def load(cls, path):
+        """从缓存文件加载"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != cls.VERSION:
+                return None
+            return cls(
+                data["frame_count"], data["fps"],
+                data["keyframes"], data["timestamps"]
+            )
+        except Exception as e:
+            print(f"加载视频索引失败: {e}")
+            return None
+            
+    def save(self, path):
+        """保存到缓存文件（写完后原子替换，避免中断时留下半截索引）"""
+        try:
+            temp_path = path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": self.VERSION,
+                    "frame_count": self.frame_count,
+                    "fps": self.fps,
+                    "keyframes": self.keyframes,
+                    "timestamps": self.timestamps
+                }, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"保存视频索引失败: {e}")
+            
+    def keyframe_before(self, frame_number):
+        """不晚于指定帧的最近关键帧"""
+        i = bisect.bisect_right(self.keyframes, frame_number) - 1
+        return self.keyframes[max(i, 0)]
+        
+    def keyframe_after(self, frame_number):
+        """晚于指定帧的下一个关键帧，没有则返回帧数"""
+        i = bisect.bisect_right(self.keyframes, frame_number)
+        if i < len(self.keyframes):
+            return self.keyframes[i]
+        return self.frame_count
+        
+    def frame_at_time(self, msec):
+        """显示时间不晚于msec的帧号"""
+        if not self.timestamps:
+            # 容许 time_of_frame 换算回来的浮点误差
+            return int(msec * self.fps / 1000 + 1e-6)
+        i = bisect.bisect_right(self.timestamps, msec) - 1
+        return max(0, min(i, self.frame_count - 1))
+        
+    def time_of_frame(self, frame_number):
+        """帧的显示时间戳(ms)；没有时间戳表时按平均帧率换算"""
+        if not self.timestamps:
+            return frame_number * 1000 / self.fps
+        return self.timestamps[max(0, min(frame_number, len(self.timestamps) - 1))]
+        
+    def frame_at_pts(self, msec):
+        """时间戳最接近msec的帧号（解码器报告的时间戳带有换算误差）
+
+        与最接近的一帧相差超过半个平均帧间隔时认为不是表中的帧，返回None。
+        """
+        timestamps = self.timestamps
+        if not timestamps:
+            return None
+        i = bisect.bisect_left(timestamps, msec)
+        if i == len(timestamps) or (i > 0 and msec - timestamps[i - 1] <= timestamps[i] - msec):
+            i -= 1
+        if abs(timestamps[i] - msec) > 500 / self.fps:
+            return None
+        return i
+        
+    def duration(self):
+        """视频时长(ms)：最后一帧的时间戳再加一个帧间隔"""
+        if len(self.timestamps) < 2:
+            return self.frame_count * 1000 / self.fps
+        return 2 * self.timestamps[-1] - self.timestamps[-2]
@@ -0,0 +1,159 @@
+"""
+视频库 - 递归扫描目录中的视频，探测元数据并持久化索引
+"""
+import os
+import json
+import cv2
+
+from .file_utils import CACHE_DIR, VIDEO_EXTENSIONS
+
+
+def fourcc_to_str(value):
+    """把 CAP_PROP_FOURCC 的数值转换为四字符编码名"""
+    code = int(value)
+    chars = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return chars.strip("\x00 ").lower()
+
+
+def probe_video(path):
+    """打开视频读取元数据（不解码），无法打开时 readable 为False"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return {"readable": False}
+        return {
+            "readable": True,
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS) or 0.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "codec": fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC))
+        }
+    finally:
+        cap.release()
+
+
+class VideoLibrary:
+    """视频元数据索引
+
+    以视频的绝对路径为键，记录文件大小、修改时间和探测到的元数据，保存在 .cache/library.json。
+    重新扫描时大小和修改时间都没有变化的文件直接复用记录，只有新增或改变的文件才打开探测。
+    """
+    
+    VERSION = 1
+    INDEX_FILE = os.path.join(CACHE_DIR, "library.json")
+    SAVE_INTERVAL = 200         # 每探测多少个文件保存一次（扫描被中断时保留已有进度）
+    
+    def __init__(self, index_file=None):
+        self.index_file = index_file or self.INDEX_FILE
+        self.entries = {}       # 绝对路径 -> 记录
+        self.dirty = False
+        self.load()
+        
+    def load(self):
+        """读取索引文件，版本不符或损坏时从空索引开始"""
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+        except Exception as e:
+            print(f"加载视频库索引失败: {e}")
+            
+    def save(self):
+        """有变化时写入索引（先写临时文件再替换）"""
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+            tmp_path = self.index_file + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.VERSION, "entries": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_file)
+            self.dirty = False
+        except Exception as e:
+            print(f"保存视频库索引失败: {e}")
+            
+    def walk(self, directory, is_cancelled=None, visited=None):
+        """递归列出目录下的视频文件，生成 (路径, stat)；跳过隐藏文件和目录
+
+        符号链接指向的目录照常进入，但每个目录（按设备号和inode）只进入一次，
+        链接成环或多个链接指向同一目录时不会无限递归或重复列出。
+        """
+        if visited is None:
+            visited = set()
+        try:
+            stat = os.stat(directory)
+        except OSError as e:
+            print(f"读取目录失败: {e}")
+            return
+        if (stat.st_dev, stat.st_ino) in visited:
+            return
+        visited.add((stat.st_dev, stat.st_ino))
+        
+        try:
+            with os.scandir(directory) as it:
+                items = sorted(it, key=lambda e: e.name.lower())
+        except OSError as e:
+            print(f"读取目录失败: {e}")
+            return
+            
+        for item in items:
+            if is_cancelled is not None and is_cancelled():
+                return
+            if item.name.startswith("."):
+                continue
+            try:
+                if item.is_dir():
+                    yield from self.walk(item.path, is_cancelled, visited)
+                elif item.name.lower().endswith(VIDEO_EXTENSIONS):
+                    yield item.path, item.stat()
+            except OSError as e:
+                print(f"读取文件信息失败: {e}")
+                
+    def lookup(self, path, stat):
+        """取得视频的记录：大小和修改时间未变时复用索引，否则重新探测。返回 (记录, 是否探测)"""
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry, False
+            
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        entry.update(probe_video(path))
+        self.entries[key] = entry
+        self.dirty = True
+        return entry, True
+        
+    def scan(self, directory, on_entry, is_cancelled=None):
+        """扫描目录，每个视频调用一次 on_entry(记录)
+
+        传给 on_entry 的记录附带 path（目录路径拼接相对路径）和 name（相对路径）。
+        扫描完成后删除该目录下已不存在的文件的记录并保存索引。返回 (视频数, 探测数)，取消时返回None。
+        """
+        root = os.path.abspath(directory)
+        seen = set()
+        probed = 0
+        try:
+            for path, stat in self.walk(directory, is_cancelled):
+                entry, was_probed = self.lookup(path, stat)
+                if was_probed:
+                    probed += 1
+                    if probed % self.SAVE_INTERVAL == 0:
+                        self.save()
+                seen.add(os.path.abspath(path))
+                on_entry(dict(entry, path=path, name=os.path.relpath(path, directory)))
+                
+            if is_cancelled is not None and is_cancelled():
+                return None
+                
+            prefix = os.path.join(root, "")
+            stale = [key for key in self.entries if key.startswith(prefix) and key not in seen]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self.dirty = True
+            return len(seen), probed
+        finally:
+            self.save()
@@ -0,0 +1,312 @@
+"""
+苹果疏果辅助标注工具 - 命令行批量抽帧（不依赖PyQt6，可在无界面的服务器上运行）
+
+按与界面相同的目录结构和元数据格式保存候选帧的ROI图像，之后可在界面的审阅模式中查看。
+多个视频由进程池并行解码；元数据只由主进程写入标注日志。
+
+用法示例:
+    python extract_frames.py video --every 30
+    python extract_frames.py a.mp4 b.mp4 --times 1.5,3,10 --roi 100,50,640,480
+    python extract_frames.py --csv frames.csv --workers 4
+
+CSV文件需包含表头，列: video（必需）, frame 或 time（秒）, 可选 x, y, w, h, comment。
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from app.utils.file_utils import (
+    ConfigManager, AnnotationManager, IMAGE_FORMATS, VIDEO_EXTENSIONS, write_image_file
+)
+from app.utils.frame_decoder import FrameDecoder
+
+
+def parse_roi(text):
+    """解析 "x,y,w,h" 形式的ROI"""
+    try:
+        x, y, w, h = (int(v) for v in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ROI格式应为 x,y,w,h: {text}")
+    if w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError(f"ROI宽高必须为正: {text}")
+    return [x, y, w, h]
+
+
+def parse_times(text):
+    """解析逗号分隔的时间点（秒）"""
+    try:
+        return [float(v) for v in text.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"时间点应为逗号分隔的秒数: {text}")
+
+
+def collect_videos(paths):
+    """展开命令行给出的视频文件和目录"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if filename.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(path, filename))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"找不到视频: {path}")
+    return videos
+
+
+def read_csv_requests(csv_path):
+    """读取CSV中的抽帧请求 {视频路径: [请求, ...]}
+
+    每个请求为 {"frame"或"time": ..., "roi": [x, y, w, h] 或 None, "comment": str}。
+    """
+    requests = {}
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            video = (row.get("video") or "").strip()
+            if not video:
+                print(f"CSV第{line_number}行缺少video列，已跳过")
+                continue
+                
+            request = {"roi": None, "comment": row.get("comment") or ""}
+            try:
+                if (row.get("frame") or "").strip():
+                    request["frame"] = int(row["frame"])
+                elif (row.get("time") or "").strip():
+                    request["time"] = float(row["time"])
+                else:
+                    print(f"CSV第{line_number}行缺少frame或time列，已跳过")
+                    continue
+                if all((row.get(key) or "").strip() for key in "xywh"):
+                    request["roi"] = [int(row[key]) for key in "xywh"]
+            except ValueError as e:
+                print(f"CSV第{line_number}行格式错误，已跳过: {e}")
+                continue
+                
+            requests.setdefault(video, []).append(request)
+    return requests
+
+
+def crop_roi(frame, roi):
+    """按ROI裁剪（超出画面的部分被截掉），返回 (ROI图像, 实际ROI)，完全在画面外时返回 (None, None)"""
+    height, width = frame.shape[:2]
+    if roi is None:
+        return frame, [0, 0, width, height]
+        
+    x, y, w, h = roi
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None, None
+    return frame[y0:y1, x0:x1], [x0, y0, x1 - x0, y1 - y0]
+
+
+def init_worker():
+    """工作进程初始化: 每个进程各解码一个视频，限制OpenCV内部线程避免争抢CPU"""
+    cv2.setNumThreads(1)
+
+
+def extract_video(task):
+    """工作进程: 解码一个视频的请求帧并写入图像
+
+    返回 (视频路径, [(图像ID, 元数据), ...], [错误信息, ...])。
+    元数据不在这里写入日志，由主进程统一追加，避免多个进程同时写日志文件。
+    """
+    video_path = task["video_path"]
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    results = []
+    errors = []
+    
+    decoder = FrameDecoder(video_path)
+    if not decoder.open(build_index=True):
+        return video_path, results, [f"无法打开视频: {video_path}"]
+        
+    try:
+        # 时间点和间隔抽帧都转换为帧号；超出视频时长的时间点报错而不是取最后一帧
+        if decoder.index is not None:
+            duration = decoder.index.duration()
+        else:
+            duration = decoder.frame_count * 1000 / decoder.fps
+        requests = []
+        for request in task["requests"]:
+            if "frame" in request:
+                frame_number = request["frame"]
+            elif not 0 <= request["time"] * 1000 < duration:
+                errors.append(
+                    f"{video_name}: 时间 {request['time']}s 超出视频时长 ({duration / 1000:.2f}s)"
+                )
+                continue
+            elif decoder.index is not None:
+                frame_number = decoder.index.frame_at_time(request["time"] * 1000)
+            else:
+                frame_number = int(round(request["time"] * decoder.fps))
+            requests.append((frame_number, request))
+        if task["every"]:
+            requests.extend(
+                (frame_number, {"roi": task["roi"], "comment": task["comment"]})
+                for frame_number in range(0, decoder.frame_count, task["every"])
+            )
+            
+        # 多个请求落在同一帧时只解码一次，以先出现的请求（明确指定的帧和时间优先于间隔抽帧）为准
+        targets = {}
+        for frame_number, request in requests:
+            targets.setdefault(frame_number, request)
+            
+        # 按帧号顺序解码，同一GOP内的请求只需向前顺序解码
+        for frame_number, request in sorted(targets.items(), key=lambda item: item[0]):
+            image_id = f"{video_name}_frame_{frame_number}"
+            if image_id in task["skip_ids"]:
+                continue
+                
+            if not 0 <= frame_number < decoder.frame_count:
+                errors.append(f"{image_id}: 帧号超出范围 (共 {decoder.frame_count} 帧)")
+                continue
+            frame = decoder.read(frame_number)
+            if frame is None:
+                errors.append(f"{image_id}: 解码失败")
+                continue
+                
+            roi_image, roi_coords = crop_roi(frame, request.get("roi") or task["roi"])
+            if roi_image is None:
+                errors.append(f"{image_id}: ROI在画面之外")
+                continue
+                
+            try:
+                ann_path = write_image_file(
+                    AnnotationManager.ANNOTATION_DIR, image_id, roi_image, task["annotation_format"]
+                )
+                # 没有标记点时参考图与ROI图像相同
+                ref_path = None
+                if task["reference_format"] is not None:
+                    ref_path = write_image_file(
+                        AnnotationManager.REFERENCE_DIR, image_id, roi_image, task["reference_format"]
+                    )
+                else:
+                    # overlay模式: 删除以前保存的参考图文件
+                    for ext in IMAGE_FORMATS.values():
+                        old_ref_path = os.path.join(AnnotationManager.REFERENCE_DIR, f"{image_id}{ext}")
+                        if os.path.exists(old_ref_path):
+                            os.remove(old_ref_path)
+            except (IOError, OSError) as e:
+                errors.append(f"{image_id}: {e}")
+                continue
+                
+            data = {
+                "source_video": video_name,
+                "frame_number": frame_number,
+                "pts_ms": decoder.frame_time(frame_number),
+                "roi_coords": roi_coords,
+                "comment": request.get("comment") or "",
+                "points": []
+            }
+            results.append((image_id, AnnotationManager.build_metadata(data, ann_path, ref_path)))
+    finally:
+        decoder.release()
+        
+    return video_path, results, errors
+
+
+def build_tasks(args, annotation_manager):
+    """根据命令行参数构建每个视频的任务"""
+    requests = {}
+    for video_path in collect_videos(args.videos):
+        requests.setdefault(video_path, [])
+        for seconds in args.times or []:
+            requests[video_path].append({"time": seconds, "roi": None, "comment": args.comment})
+    if args.csv:
+        for video_path, video_requests in read_csv_requests(args.csv).items():
+            requests.setdefault(video_path, []).extend(video_requests)
+            
+    skip_ids = set() if args.overwrite else set(annotation_manager.load_annotations())
+    annotation_format = annotation_manager.get_output_format(AnnotationManager.ANNOTATION_DIR)
+    reference_format = None
+    if annotation_manager.stores_reference():
+        reference_format = annotation_manager.get_output_format(AnnotationManager.REFERENCE_DIR)
+        
+    tasks = []
+    for video_path, video_requests in requests.items():
+        if not video_requests and not args.every:
+            continue
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        tasks.append({
+            "video_path": video_path,
+            "requests": video_requests,
+            "every": args.every,
+            "roi": args.roi,
+            "comment": args.comment,
+            # 只传递该视频已有的图像ID，减少进程间传输
+            "skip_ids": {
+                image_id for image_id in skip_ids
+                if image_id.startswith(f"{video_name}_frame_")
+            },
+            "annotation_format": annotation_format,
+            "reference_format": reference_format
+        })
+    return tasks
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="批量抽取视频帧并按标注工具的格式保存ROI图像和元数据（不需要图形界面）"
+    )
+    parser.add_argument("videos", nargs="*", help="视频文件或包含视频的目录")
+    parser.add_argument("--every", type=int, default=0, metavar="N", help="每隔N帧抽取一帧")
+    parser.add_argument("--times", type=parse_times, metavar="T1,T2,...", help="按时间点（秒）抽帧")
+    parser.add_argument("--csv", metavar="FILE", help="从CSV读取抽帧列表")
+    parser.add_argument("--roi", type=parse_roi, metavar="X,Y,W,H", help="ROI区域，默认整帧")
+    parser.add_argument("--comment", default="", help="写入元数据的注释")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行解码的进程数")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的标注")
+    args = parser.parse_args(argv)
+    
+    if args.every < 0:
+        parser.error("--every 必须为正数")
+    if not (args.every or args.times or args.csv):
+        parser.error("需要指定 --every、--times 或 --csv 之一")
+    if (args.every or args.times) and not args.videos:
+        parser.error("--every 和 --times 需要指定视频")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    
+    annotation_manager = AnnotationManager(ConfigManager())
+    tasks = build_tasks(args, annotation_manager)
+    if not tasks:
+        print("没有需要处理的视频")
+        return 1
+        
+    saved = 0
+    failed = 0
+    workers = max(1, min(args.workers, len(tasks)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = [pool.submit(extract_video, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                video_path, results, errors = future.result()
+            except Exception as e:
+                print(f"处理视频失败: {e}")
+                failed += 1
+                continue
+                
+            for image_id, metadata in results:
+                if annotation_manager.put_annotation(image_id, metadata):
+                    saved += 1
+            for error in errors:
+                print(f"  {error}")
+            failed += len(errors)
+            print(f"[{done}/{len(tasks)}] {video_path}: 保存 {len(results)} 帧")
+            
+    print(f"完成: 保存 {saved} 帧，失败 {failed} 项，用时 {time.perf_counter() - start:.1f}s")
+    return 0 if not failed else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())